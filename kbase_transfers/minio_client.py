@@ -1,9 +1,26 @@
 # MinIO client for loading files into the KBase Lakehouse Object Store
 import boto3
+import gzip
+import hashlib
+import io
 import os
 import json
+import queue
+import threading
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
+try:
+    import orjson
+except ImportError:  # optional: fall back to the standard library encoder
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # optional: 'zstd' compression is unavailable without it
+    zstandard = None
+
 endpoint_url = "http://localhost:9000"
 access_key = "minioadmin"
 secret_key = "minioadmin"
@@ -16,24 +33,280 @@ if "MINIO_SECRET_KEY" in os.environ:
 if "MINIO_ENDPOINT_URL" in os.environ:
     endpoint_url = os.environ["MINIO_ENDPOINT_URL"]
 
+# Multipart settings for files on disk (upload_file / download_file), in MiB.
+# Genome files run from hundreds of MB to several GB; against a local MinIO
+# fewer, larger parts spend less time on per-request overhead than boto3's
+# 8 MiB default.
+file_multipart_threshold_mb = 64
+file_multipart_chunksize_mb = 64
+file_max_concurrency = 8
+
+if "MINIO_MULTIPART_THRESHOLD_MB" in os.environ:
+    file_multipart_threshold_mb = int(os.environ["MINIO_MULTIPART_THRESHOLD_MB"])
+if "MINIO_MULTIPART_CHUNKSIZE_MB" in os.environ:
+    file_multipart_chunksize_mb = int(os.environ["MINIO_MULTIPART_CHUNKSIZE_MB"])
+if "MINIO_MAX_CONCURRENCY" in os.environ:
+    file_max_concurrency = int(os.environ["MINIO_MAX_CONCURRENCY"])
+
+# Maximum keys per DeleteObjects request
+_DELETE_BATCH_SIZE = 1000
+
+# Shared client configuration.  The default urllib3 pool holds only 10
+# connections, which makes threads block (and reconnect) once more than 10
+# uploads are in flight.  Since botocore 1.36 every PUT also gets a CRC32
+# checksum computed (and every GET validated) by default; that is pure CPU
+# overhead on many small uploads, so checksums are only used where an
+# operation requires them.  Transient errors and throttling on any call
+# (PUT, LIST and DELETE alike) are retried inside botocore with backoff;
+# nothing in this module adds a retry loop of its own on top.
+client_config = Config(
+    max_pool_connections=64,
+    retries={'max_attempts': 10, 'mode': 'adaptive'},
+    tcp_keepalive=True,
+    request_checksum_calculation='when_required',
+    response_checksum_validation='when_required',
+)
+
+# In-memory payloads at or above the multipart threshold (e.g. a large
+# resources.json or NDJSON shard) are uploaded as concurrent 16 MiB parts.
+payload_transfer_config = TransferConfig(
+    multipart_threshold=16 * 1024 * 1024,
+    multipart_chunksize=16 * 1024 * 1024,
+    max_concurrency=8,
+    use_threads=True,
+)
+
+# Files on disk, tuned by the file_* settings above.  With 64 MiB parts,
+# 1 MiB reads/writes (boto3 defaults to 256 KiB) cut the per-call overhead
+# of streaming each part to and from disk.
+file_transfer_config = TransferConfig(
+    multipart_threshold=file_multipart_threshold_mb * 1024 * 1024,
+    multipart_chunksize=file_multipart_chunksize_mb * 1024 * 1024,
+    max_concurrency=file_max_concurrency,
+    io_chunksize=1024 * 1024,
+    use_threads=True,
+)
+
+# Streamed uploads (see StreamingUpload) buffer whole parts in memory, so they
+# use smaller parts and fewer concurrent part uploads than payload uploads.
+stream_transfer_config = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=4,
+    use_threads=True,
+)
+
+# Supported Content-Encodings for in-memory payloads, and the key suffix
+# callers conventionally append to compressed objects.  Level 3 gets most of
+# gzip's size reduction on JSON for a fraction of the default level's CPU;
+# zstd at level 3 compresses JSON smaller than gzip and several times faster.
+_COMPRESSORS = {
+    'gzip': lambda body: gzip.compress(body, compresslevel=3),
+}
+COMPRESSION_SUFFIXES = {
+    'gzip': '.gz',
+}
+if zstandard is not None:
+    # A compressor per call: ZstdCompressor instances are not thread-safe
+    _COMPRESSORS['zstd'] = lambda body: zstandard.ZstdCompressor(level=3).compress(body)
+    COMPRESSION_SUFFIXES['zstd'] = '.zst'
+
+
+def _json_bytes(data):
+    """Serialise data as indented UTF-8 JSON, using orjson when available.
+
+    orjson is several times faster than json.dumps and also accepts numpy
+    scalars; values it cannot encode (e.g. ints wider than 64 bits) fall
+    back to the standard library.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(
+                data,
+                option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+            )
+        except TypeError:
+            pass
+    return json.dumps(data, indent=2).encode('utf-8')
+
+
+class _ChunkQueueReader:
+    """Minimal file-like reader over a queue of byte chunks.
+
+    ``None`` on the queue marks end of stream; an exception instance is
+    raised from read() so the transfer consuming this reader fails (and, for
+    a multipart upload, is aborted) instead of completing.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._buffer = bytearray()
+        self._eof = False
+
+    def read(self, size=-1):
+        # s3transfer treats a short read as end of stream, so block until
+        # size bytes are buffered or the writer has finished.
+        while not self._eof and (size is None or size < 0 or len(self._buffer) < size):
+            chunk = self._chunks.get()
+            if chunk is None:
+                self._eof = True
+            elif isinstance(chunk, BaseException):
+                raise chunk
+            else:
+                self._buffer += chunk
+        if size is None or size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+
+class StreamUploadAborted(Exception):
+    """Raised inside a StreamingUpload's transfer when the writer aborts it."""
+
+
+class StreamingUpload:
+    """Upload an object from chunks written incrementally, without a local file.
+
+    A background thread feeds the chunks to boto3's managed upload, which
+    sends a single PUT for small objects and concurrent multipart parts for
+    large ones.  At most ``max_buffered_chunks`` chunks wait in memory; write()
+    blocks beyond that, applying backpressure to the producer.
+
+    Use through MinioClient.open_upload_stream().  close() completes the
+    upload; abort() discards it so no object is created.
+    """
+
+    def __init__(self, s3, bucket_name, object_name, metadata=None, max_buffered_chunks=256):
+        self._chunks = queue.Queue(maxsize=max_buffered_chunks)
+        self._error = None
+        self._finished = False
+        self.bytes_written = 0
+        extra_args = {'Metadata': metadata} if metadata else None
+        self._thread = threading.Thread(
+            target=self._upload,
+            args=(s3, bucket_name, object_name, extra_args),
+            daemon=True,
+        )
+        self._thread.start()
+
+    def _upload(self, s3, bucket_name, object_name, extra_args):
+        try:
+            s3.upload_fileobj(_ChunkQueueReader(self._chunks), bucket_name, object_name,
+                              ExtraArgs=extra_args, Config=stream_transfer_config)
+        except BaseException as e:
+            self._error = e
+
+    def _put(self, item):
+        # Never block forever on a full queue if the upload thread has died
+        while True:
+            try:
+                self._chunks.put(item, timeout=1)
+                return
+            except queue.Full:
+                if not self._thread.is_alive():
+                    raise self._error or RuntimeError("Upload thread exited unexpectedly")
+
+    def write(self, chunk):
+        if self._error is not None:
+            raise self._error
+        self._put(bytes(chunk))
+        self.bytes_written += len(chunk)
+
+    def close(self):
+        """Finish the stream and wait for the upload to complete."""
+        if self._finished:
+            return
+        self._finished = True
+        self._put(None)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def abort(self):
+        """Discard the upload; no object is written."""
+        if self._finished:
+            return
+        self._finished = True
+        if self._thread.is_alive():
+            self._put(StreamUploadAborted())
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
 class MinioClient:
-    def __init__(self, endpoint_url=endpoint_url, access_key=access_key, secret_key=secret_key):
-        self.s3 = boto3.client(
+    def __init__(self, endpoint_url=endpoint_url, access_key=access_key, secret_key=secret_key,
+                 max_pool_connections=None):
+        # Callers running more concurrent requests than the shared pool size
+        # should raise max_pool_connections so threads never wait on a socket.
+        config = client_config
+        if max_pool_connections is not None:
+            config = client_config.merge(Config(max_pool_connections=max_pool_connections))
+        # A private Session per client: boto3's default session is not safe to
+        # create clients from concurrently, and scripts build one per thread.
+        self.s3 = boto3.session.Session().client(
             's3',
             endpoint_url=endpoint_url,
             aws_access_key_id=access_key,
-            aws_secret_access_key=secret_key
+            aws_secret_access_key=secret_key,
+            config=config,
         )
+        self.transfer_config = file_transfer_config
 
     def upload_file(self, bucket_name, object_name, file_path, metadata=None):
         extra_args = {}
         if metadata:
             extra_args['Metadata'] = metadata
         self.s3.upload_file(file_path, bucket_name, object_name,
-                            ExtraArgs=extra_args if extra_args else None)
+                            ExtraArgs=extra_args if extra_args else None,
+                            Config=self.transfer_config)
+
+    def open_upload_stream(self, bucket_name, object_name, metadata=None):
+        """Return a StreamingUpload that writes object_name from in-memory chunks.
+
+        Use it as a context manager: the upload completes when the block
+        exits normally and is aborted (nothing is written) if it raises.
+        """
+        return StreamingUpload(self.s3, bucket_name, object_name, metadata=metadata)
 
     def download_file(self, bucket_name, object_name, file_path):
-        self.s3.download_file(bucket_name, object_name, file_path)
+        self.s3.download_file(bucket_name, object_name, file_path,
+                              Config=self.transfer_config)
+
+    def object_md5(self, bucket_name, object_name, chunk_size=1024 * 1024):
+        """Return the MD5 hex digest of an object's content.
+
+        The body is hashed as it streams in, with nothing written to disk.
+        """
+        md5 = hashlib.md5()
+        body = self.s3.get_object(Bucket=bucket_name, Key=object_name)['Body']
+        for chunk in body.iter_chunks(chunk_size):
+            md5.update(chunk)
+        return md5.hexdigest()
+
+    def delete_objects(self, bucket_name, keys):
+        """Delete keys with DeleteObjects, up to 1000 (the S3 limit) per request.
+
+        Returns the number of keys deleted.
+        """
+        keys = list(keys)
+        deleted = 0
+        for start in range(0, len(keys), _DELETE_BATCH_SIZE):
+            batch = keys[start:start + _DELETE_BATCH_SIZE]
+            response = self.s3.delete_objects(
+                Bucket=bucket_name,
+                Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True},
+            )
+            deleted += len(batch) - len(response.get('Errors', []))
+        return deleted
 
     def update_metadata(self, bucket_name, object_name, metadata):
         """Update user metadata on an existing object via a server-side copy.
@@ -55,10 +328,12 @@ class MinioClient:
             return False
 
     def stat_object(self, bucket_name, object_name):
-        """Return {'size': int, 'md5': str|None} via a single HEAD request.
+        """Return {'size': int, 'md5': str|None, 'etag': str} via a single HEAD request.
 
         'md5' comes from the user-metadata key 'md5', stored when files are
-        uploaded with upload_file(metadata={'md5': <hex>}).
+        uploaded with upload_file(metadata={'md5': <hex>}).  'etag' has its
+        quotes stripped; for a single-part upload it is the MD5 of the content,
+        for a multipart upload it ends in '-<part count>'.
         Returns None if the object does not exist or the request fails.
         """
         try:
@@ -66,27 +341,109 @@ class MinioClient:
             return {
                 'size': response.get('ContentLength'),
                 'md5': response.get('Metadata', {}).get('md5'),
+                'etag': response.get('ETag', '').strip('"'),
             }
         except Exception:
             return None
 
+    def iter_objects(self, bucket_name, prefix=''):
+        """Yield every key under prefix, fetching one page of 1000 at a time.
+
+        Callers that only need the first match can stop early without
+        listing (or holding) the rest of the prefix.
+        """
+        paginator = self.s3.get_paginator('list_objects_v2')
+        pages = paginator.paginate(Bucket=bucket_name, Prefix=prefix,
+                                   PaginationConfig={'PageSize': 1000})
+        for page in pages:
+            for obj in page.get('Contents', []):
+                yield obj['Key']
+
     def list_objects(self, bucket_name, prefix=''):
-        response = self.s3.list_objects_v2(Bucket=bucket_name, Prefix=prefix)
-        return [obj['Key'] for obj in response.get('Contents', [])]
+        """Return every key under prefix, following pagination."""
+        return list(self.iter_objects(bucket_name, prefix))
+    
+    def list_keys_set(self, bucket_name, prefix=''):
+        """Return the set of every key under prefix, following pagination.
+
+        One paginated LIST is far cheaper than a HEAD per object when checking
+        many keys for existence.
+        """
+        return set(self.iter_objects(bucket_name, prefix))
+    
+    def stat_prefix(self, bucket_name, prefix):
+        """Return {name: {'size': int, 'etag': str}} for every object under prefix.
+
+        Names are keys with the prefix removed.  One paginated LIST replaces a
+        HEAD per object when checking a directory's worth of files; user
+        metadata is not included in listings (use stat_object for that).
+        """
+        paginator = self.s3.get_paginator('list_objects_v2')
+        return {
+            obj['Key'][len(prefix):]: {'size': obj['Size'], 'etag': obj['ETag'].strip('"')}
+            for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix)
+            for obj in page.get('Contents', [])
+        }
     
     def list_buckets(self):
         response = self.s3.list_buckets()
         return [bucket['Name'] for bucket in response.get('Buckets', [])]
     
-    def put_json_object(self, bucket_name, object_name, data):
-        """Upload a JSON object to MinIO."""
-        json_bytes = json.dumps(data, indent=2).encode('utf-8')
-        self.s3.put_object(
-            Bucket=bucket_name,
-            Key=object_name,
-            Body=json_bytes,
-            ContentType='application/json'
-        )
+    def put_bytes(self, bucket_name, object_name, body, content_type='application/octet-stream',
+                  if_absent=False, compression=None):
+        """Upload an in-memory payload to MinIO.
+
+        With if_absent=True the PUT is conditional (If-None-Match: *), so the
+        server refuses to overwrite an existing object.  Returns True if the
+        object was written, False if it already existed.
+
+        compression (e.g. 'gzip' or 'zstd') compresses the body and records it as the
+        object's Content-Encoding; object_name is used unchanged, so callers
+        add any suffix (see COMPRESSION_SUFFIXES) themselves.
+
+        Payloads larger than payload_transfer_config's multipart threshold
+        are sent as a multipart upload with concurrent parts (conditional
+        uploads always use a single PUT).
+        """
+        headers = {'ContentType': content_type}
+        if compression is not None:
+            if compression not in _COMPRESSORS:
+                raise ValueError(f"Unsupported compression: {compression!r}")
+            body = _COMPRESSORS[compression](body)
+            headers['ContentEncoding'] = compression
+
+        if not if_absent and len(body) >= payload_transfer_config.multipart_threshold:
+            self.s3.upload_fileobj(
+                io.BytesIO(body), bucket_name, object_name,
+                ExtraArgs=headers,
+                Config=payload_transfer_config,
+            )
+            return True
+
+        if if_absent:
+            headers['IfNoneMatch'] = '*'
+        try:
+            self.s3.put_object(
+                Bucket=bucket_name,
+                Key=object_name,
+                Body=body,
+                **headers
+            )
+        except ClientError as e:
+            if if_absent and e.response.get('Error', {}).get('Code') in ('PreconditionFailed', '412'):
+                return False
+            raise
+        return True
+
+    def put_json_object(self, bucket_name, object_name, data, if_absent=False, compression=None):
+        """Upload a JSON object to MinIO.
+
+        See put_bytes() for the meaning of if_absent, compression and the
+        return value.
+        """
+        return self.put_bytes(bucket_name, object_name, _json_bytes(data),
+                              content_type='application/json', if_absent=if_absent,
+                              compression=compression)
     
     def prefix_exists(self, bucket_name, prefix):
         """Check if a prefix (folder path) exists in the bucket."""
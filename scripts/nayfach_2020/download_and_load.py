@@ -10,15 +10,26 @@ Supplementary Data: https://static-content.springer.com/esm/art%3A10.1038%2Fs415
 """
 
 import argparse
+import hashlib
+import io
+import json
 import os
+import re
+import shutil
 import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import requests
+import numpy as np
 import pandas as pd
 from pathlib import Path
+from requests.adapters import HTTPAdapter
+from tqdm import tqdm
+from urllib3.util.retry import Retry
 
 # Add parent directory to path to import kbase_transfers
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
-from kbase_transfers.minio_client import MinioClient
+from kbase_transfers.minio_client import COMPRESSION_SUFFIXES, MinioClient
 import dts
 
 
@@ -32,6 +43,34 @@ RAW_DATA_PATH = f"{BASE_PATH}/raw_data"
 METAGENOMES_PATH = f"{RAW_DATA_PATH}/metagenomes"
 MAGS_PATH = f"{RAW_DATA_PATH}/mags"
 
+# Number of concurrent MinIO uploads per sheet.  Uploads are small PUTs, so
+# the loader is latency-bound and benefits from many requests in flight.
+DEFAULT_CONCURRENCY = 32
+
+# Number of concurrent DTS searches.  Searches run in their own pool so
+# their latency overlaps with the MinIO uploads.
+DEFAULT_DTS_CONCURRENCY = 16
+
+# Excel parser engine.  calamine (Rust) reads the 30 MB supplementary
+# workbook several times faster than pandas' default openpyxl engine.
+EXCEL_ENGINE = 'calamine'
+
+# DTS search results are cached per IMG_TAXON_ID: many MAGs share the
+# metagenome's taxon id, and the cache is saved to the data directory so
+# re-runs do not repeat the remote searches.
+DTS_CACHE_FILENAME = "dts_cache.json"
+_dts_cache: dict[str, list] = {}
+
+# Parsed workbooks keyed by (resolved path, mtime): the ZIP container is
+# opened once per process and each sheet parsed at most once, however many
+# times load_sheet/collect_sheet_stats ask for it.
+_workbook_cache: dict[tuple, dict] = {}
+
+# Optional NDJSON shard layout (--shard-size): records are packed into
+# {dest_path}/shards/<name>-NNNNN.ndjson objects plus an index.json.
+SHARDS_DIR = "shards"
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+
 # ---------------------------------------------------------------------------
 # File transfer filter rules.
 # Each entry controls which DTS files are included in the transfer and how
@@ -43,6 +82,8 @@ MAGS_PATH = f"{RAW_DATA_PATH}/mags"
 #   filename  - include files whose basename exactly matches this string.
 #   rename_to - destination filename template; {img_taxon_id} is substituted.
 #               Omit (or set to None) to keep the original basename.
+#
+# A file matches at most one rule: the first in this list that applies.
 # ---------------------------------------------------------------------------
 FILE_FILTERS = [
     {"label": ".fna files",              "suffix": ".fna"},
@@ -53,26 +94,117 @@ FILE_FILTERS = [
 ]
 
 
+def _compile_file_filters(rules):
+    """Compile rules into one regex over a basename, with a group per rule.
+
+    Suffix rules match case-insensitively, filename rules exactly.  The
+    alternatives are tried in rule order, so as with a loop over the rules
+    the first matching rule wins; match.lastindex - 1 is its position.
+    """
+    alternatives = [
+        f"((?i:.*{re.escape(rule['suffix'])}))" if 'suffix' in rule else f"({re.escape(rule['filename'])})"
+        for rule in rules
+    ]
+    return re.compile('|'.join(alternatives), re.DOTALL)
+
+
+# Compiled once, so _filter_resources does a single regex match per path
+# instead of looping over every rule
+_FILE_FILTERS_RE = _compile_file_filters(FILE_FILTERS)
+
+
+def _file_sha256(path):
+    with open(path, 'rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+
+
+class _HashingWriter:
+    """File wrapper that feeds everything written through it to a hash."""
+
+    def __init__(self, f, hash_obj):
+        self._f = f
+        self._hash = hash_obj
+
+    def write(self, data):
+        self._hash.update(data)
+        return self._f.write(data)
+
+
+def _is_workbook(path):
+    """Return True if path opens as an Excel workbook (e.g. is not truncated)."""
+    try:
+        with pd.ExcelFile(path, engine=EXCEL_ENGINE):
+            return True
+    except Exception:
+        return False
+
+
 def download_xlsx(data_dir, force=False):
-    """Download the Excel file if it doesn't exist."""
+    """Download the Excel file if it doesn't exist.
+
+    A SHA-256 of the download is kept next to it (<name>.sha256).  An
+    existing file is reused only if it still matches, so a damaged copy is
+    replaced instead of being reused.  A file without a sidecar (downloaded
+    before it existed) gets one only if it opens as a workbook; otherwise,
+    e.g. when an earlier download was interrupted, it is downloaded again.
+    """
     xlsx_path = data_dir / XLSX_FILENAME
+    digest_path = xlsx_path.with_name(xlsx_path.name + '.sha256')
     
     if xlsx_path.exists() and not force:
-        print(f"Excel file already exists at {xlsx_path}")
-        return xlsx_path
+        digest = _file_sha256(xlsx_path)
+        if digest_path.exists():
+            verified = digest_path.read_text().strip() == digest
+        else:
+            verified = _is_workbook(xlsx_path)
+            if verified:
+                digest_path.write_text(digest + '\n')
+        if verified:
+            print(f"Excel file already exists at {xlsx_path}")
+            return xlsx_path
+        print(f"Excel file at {xlsx_path} failed verification, re-downloading")
     
     print(f"Downloading Excel file from {XLSX_URL}...")
-    response = requests.get(XLSX_URL, stream=True)
-    response.raise_for_status()
-    
-    with open(xlsx_path, 'wb') as f:
-        for chunk in response.iter_content(chunk_size=8192):
-            f.write(chunk)
+    retry = Retry(total=5, backoff_factor=0.5, status_forcelist=[502, 503, 504])
+    with requests.Session() as session:
+        session.mount('https://', HTTPAdapter(max_retries=retry))
+        with session.get(XLSX_URL, stream=True, timeout=(5, 60)) as response:
+            response.raise_for_status()
+            # Copy the raw stream in 1 MiB blocks with shutil.copyfileobj
+            # instead of looping over small iter_content chunks in Python,
+            # hashing as it is written.
+            response.raw.decode_content = True
+            # Write to a temporary name so an interrupted download never
+            # leaves a truncated file that later runs would reuse.
+            part_path = xlsx_path.with_name(xlsx_path.name + '.part')
+            sha256 = hashlib.sha256()
+            with open(part_path, 'wb') as f:
+                shutil.copyfileobj(response.raw, _HashingWriter(f, sha256), 1 << 20)
+    part_path.replace(xlsx_path)
+    digest_path.write_text(sha256.hexdigest() + '\n')
     
     print(f"Downloaded to {xlsx_path}")
     return xlsx_path
 
 
+def read_sheet(xlsx_path, sheet_name):
+    """Read one sheet of the supplementary Excel file into a DataFrame.
+
+    Results are cached in-process, so callers share the returned DataFrame
+    and must not modify it in place.
+    """
+    xlsx_path = Path(xlsx_path).resolve()
+    key = (str(xlsx_path), xlsx_path.stat().st_mtime_ns)
+    entry = _workbook_cache.get(key)
+    if entry is None:
+        workbook = pd.ExcelFile(xlsx_path, engine=EXCEL_ENGINE)
+        entry = _workbook_cache[key] = {'workbook': workbook, 'sheets': {}}
+    sheets = entry['sheets']
+    if sheet_name not in sheets:
+        sheets[sheet_name] = entry['workbook'].parse(sheet_name)
+    return sheets[sheet_name]
+
+
 def check_parent_paths_exist(client):
     """Check that the parent paths exist in MinIO, error if not."""
     if not client.bucket_exists(BUCKET_NAME):
@@ -97,23 +229,18 @@ def _filter_resources(resources, img_taxon_id):
     """
     filtered = []
     for resource in resources:
-        path_lower = resource['path'].lower()
         basename = resource['path'].rsplit('/', 1)[-1]
-        for rule in FILE_FILTERS:
-            matched = False
-            if 'suffix' in rule and path_lower.endswith(rule['suffix']):
-                matched = True
-            elif 'filename' in rule and basename == rule['filename']:
-                matched = True
-            if matched:
-                rename_to = rule.get('rename_to')
-                dest_name = (
-                    rename_to.format(img_taxon_id=img_taxon_id)
-                    if rename_to
-                    else basename
-                )
-                filtered.append({**resource, 'dest_name': dest_name, 'filter_label': rule['label']})
-                break  # a file matches at most one rule
+        match = _FILE_FILTERS_RE.fullmatch(basename)
+        if match is None:
+            continue
+        rule = FILE_FILTERS[match.lastindex - 1]
+        rename_to = rule.get('rename_to')
+        dest_name = (
+            rename_to.format(img_taxon_id=img_taxon_id)
+            if rename_to
+            else basename
+        )
+        filtered.append({**resource, 'dest_name': dest_name, 'filter_label': rule['label']})
     return filtered
 
 
@@ -132,33 +259,115 @@ def _to_folder_id(value):
     return str(value)
 
 
-def collect_sheet_stats(xlsx_path, sheet_name, folder_col, dts_id_col, dts_client, orcid, limit=None, verbose=False):
+def _to_folder_ids(column):
+    """Apply _to_folder_id to a whole column at once.
+
+    Integer and float columns (the usual IMG_TAXON_ID case) are converted
+    with vectorised casts; object columns, which may mix strings such as
+    '3300028580_9' with numbers, fall back to _to_folder_id per value.
+    """
+    if pd.api.types.is_integer_dtype(column):
+        ids = column.astype(str)
+    elif pd.api.types.is_float_dtype(column):
+        ids = column.where(column.notna()).apply(np.trunc).astype('Int64').astype(str)
+    else:
+        return [_to_folder_id(value) for value in column.tolist()]
+    return ids.astype(object).where(column.notna(), None).tolist()
+
+
+class ShardWriter:
+    """Pack JSON records into NDJSON shards of ``shard_size`` records each.
+
+    Each record becomes one line of a ``{prefix}/{name}-NNNNN.ndjson`` shard.
+    ``index`` maps every record id to ``[shard_key, byte_offset, length]`` so
+    a single record can still be fetched with a ranged GET.
+    """
+
+    def __init__(self, prefix, name, shard_size):
+        self.prefix = prefix
+        self.name = name
+        self.shard_size = shard_size
+        self.index = {}
+        self._buffer = io.BytesIO()
+        self._count = 0
+        self._shard_number = 1
+
+    def _shard_key(self):
+        return f"{self.prefix}/{self.name}-{self._shard_number:05d}.ndjson"
+
+    def add(self, record_id, record):
+        """Append a record; return ``(key, body)`` once the shard is full, else None."""
+        line = json.dumps(record).encode('utf-8') + b'\n'
+        self.index[record_id] = [self._shard_key(), self._buffer.tell(), len(line)]
+        self._buffer.write(line)
+        self._count += 1
+        if self._count >= self.shard_size:
+            return self.flush()
+        return None
+
+    def flush(self):
+        """Return the partially filled shard as ``(key, body)``, or None if empty."""
+        if not self._count:
+            return None
+        shard = (self._shard_key(), self._buffer.getvalue())
+        self._buffer = io.BytesIO()
+        self._count = 0
+        self._shard_number += 1
+        return shard
+
+
+def _sheet_records(df):
+    """Convert a sheet into a list of JSON-ready dicts, one per row.
+
+    NaN/NaT cells become None in a single vectorised pass; ints and floats
+    are kept as numbers and any other value (e.g. timestamps) is stringified.
+    """
+    clean = df.astype(object).where(df.notna(), None)
+    return [
+        {
+            col: value if value is None or isinstance(value, (str, float))
+            else int(value) if isinstance(value, int)
+            else str(value)
+            for col, value in row.items()
+        }
+        for row in clean.to_dict(orient='records')
+    ]
+
+
+def collect_sheet_stats(xlsx_path, sheet_name, folder_col, dts_id_col, dts_client, orcid, limit=None, verbose=False,
+                        dts_concurrency=DEFAULT_DTS_CONCURRENCY):
     """Query DTS for every row in a sheet and return a stats DataFrame.
 
     Columns: id, dts_id, total_files, <one column per FILE_FILTERS label>.
     """
-    df = pd.read_excel(xlsx_path, sheet_name=sheet_name)
+    df = read_sheet(xlsx_path, sheet_name)
     if limit is not None:
         df = df.head(limit)
 
     filter_labels = [rule['label'] for rule in FILE_FILTERS]
     rows = []
 
-    for i, (_, row) in enumerate(df.iterrows(), 1):
-        folder_id = _to_folder_id(row[folder_col])
-        dts_id = _to_folder_id(row[dts_id_col])
-
-        resources = query_dts_resources(dts_id, dts_client, orcid, verbose=verbose) if dts_id else []
-        filtered = _filter_resources(resources, dts_id) if dts_id else []
+    # Convert the two id columns once rather than building a Series per row
+    folder_ids = _to_folder_ids(df[folder_col])
+    dts_ids = _to_folder_ids(df[dts_id_col])
 
-        counts = {lbl: 0 for lbl in filter_labels}
-        for r in filtered:
-            counts[r['filter_label']] += 1
+    with ThreadPoolExecutor(max_workers=dts_concurrency) as dts_pool:
+        dts_futures = _submit_dts_queries(dts_pool, dts_ids, dts_client, orcid, verbose=verbose)
+        try:
+            progress = tqdm(zip(folder_ids, dts_ids), total=len(df), unit='row', desc="  Querying DTS")
+            for folder_id, dts_id in progress:
+                resources = dts_futures[dts_id].result() if dts_id else []
+                filtered = _filter_resources(resources, dts_id) if dts_id else []
 
-        rows.append({'id': folder_id, 'dts_id': dts_id, 'total_files': len(resources), **counts})
+                counts = {lbl: 0 for lbl in filter_labels}
+                for r in filtered:
+                    counts[r['filter_label']] += 1
 
-        if i % 100 == 0:
-            print(f"  Queried {i}/{len(df)} rows...")
+                rows.append({'id': folder_id, 'dts_id': dts_id, 'total_files': len(resources), **counts})
+        finally:
+            # Drop searches that never started if collection is aborted
+            for future in dts_futures.values():
+                future.cancel()
 
     return pd.DataFrame(rows)
 
@@ -200,15 +409,40 @@ def write_stats_xlsx(output_path, metagenome_stats, mag_stats):
     print(f"\n✓ Stats written to {output_path}")
 
 
+def load_dts_cache(cache_path):
+    """Populate the in-memory DTS cache from a JSON file, if it exists."""
+    if cache_path.exists():
+        with open(cache_path) as f:
+            _dts_cache.update(json.load(f))
+        print(f"Loaded {len(_dts_cache)} cached DTS result(s) from {cache_path}")
+
+
+def save_dts_cache(cache_path):
+    """Write the in-memory DTS cache to a JSON file."""
+    tmp_path = cache_path.with_name(cache_path.name + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(_dts_cache, f)
+    tmp_path.replace(cache_path)
+
+
 def query_dts_resources(img_taxon_id, dts_client, orcid, verbose=False):
     """
     Query DTS for file resources associated with an IMG_TAXON_ID.
+
+    Successful results are cached per IMG_TAXON_ID, so repeated ids
+    cost a dict lookup instead of a remote search.
     
     Returns:
         list: List of dicts with 'id', 'path', and 'bytes' keys, or empty list if no results
     """
     if dts_client is None:
         return []
+
+    cached = _dts_cache.get(img_taxon_id)
+    if cached is not None:
+        if verbose:
+            print(f"    Using {len(cached)} cached resource(s) for IMG_TAXON_ID {img_taxon_id}")
+        return cached
     
     try:
         results = dts_client.search(
@@ -232,6 +466,7 @@ def query_dts_resources(img_taxon_id, dts_client, orcid, verbose=False):
             else:
                 print(f"    No resources found for IMG_TAXON_ID {img_taxon_id}")
         
+        _dts_cache[img_taxon_id] = resources
         return resources
     
     except Exception as e:
@@ -239,6 +474,32 @@ def query_dts_resources(img_taxon_id, dts_client, orcid, verbose=False):
         return []
 
 
+def _submit_dts_queries(dts_pool, dts_ids, dts_client, orcid, verbose=False):
+    """Submit one DTS search per distinct id and return {dts_id: future}."""
+    futures = {}
+    for dts_id in dts_ids:
+        if dts_id and dts_id not in futures:
+            futures[dts_id] = dts_pool.submit(query_dts_resources, dts_id, dts_client, orcid, verbose=verbose)
+    return futures
+
+
+def _drain(pending, max_pending, on_result):
+    """Block until fewer than ``max_pending`` futures remain in ``pending``.
+
+    ``pending`` maps each future to its object key.  Completed futures are
+    removed and ``on_result(key, result)`` is called for each of them in the
+    caller's thread, so an upload failure is re-raised there too.
+
+    Returns the number of seconds spent waiting.
+    """
+    start = time.perf_counter()
+    while pending and len(pending) >= max_pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            on_result(pending.pop(future), future.result())
+    return time.perf_counter() - start
+
+
 def load_sheet(
     client,
     xlsx_path,
@@ -252,6 +513,11 @@ def load_sheet(
     dts_client=None,
     orcid=None,
     verbose=False,
+    concurrency=DEFAULT_CONCURRENCY,
+    dts_concurrency=DEFAULT_DTS_CONCURRENCY,
+    skip_existing=False,
+    shard_size=None,
+    compression=None,
 ):
     """Load one sheet from the Excel file into MinIO.
 
@@ -261,13 +527,27 @@ def load_sheet(
         dest_path:   MinIO path prefix for this dataset (e.g. METAGENOMES_PATH).
         folder_col:  Column whose value becomes the per-record folder name.
         dts_id_col:  Column whose value is used as the IMG_TAXON_ID for DTS queries.
+        concurrency: Maximum number of JSON uploads in flight at once.
+        dts_concurrency: Maximum number of DTS searches in flight at once.
+        skip_existing: Skip objects already in MinIO (listed once up front) and
+                     use conditional PUTs for the rest, so re-runs are resumable.
+        shard_size:  If set, pack records into NDJSON shards of this many
+                     records (see ShardWriter) instead of one object per record.
+        compression: If set (e.g. 'gzip' or 'zstd'), compress each JSON object, record
+                     it as the Content-Encoding and add the matching key suffix
+                     (gems_info.json.gz).
+
+    Returns:
+        The object keys actually written, in completion order (empty for a dry
+        run), so callers can read back what was written without listing the
+        bucket.  Keys skipped as already present are not included.
     """
     print(f"\nLoading {label} from {sheet_name} sheet...")
 
     if dts_client:
         print("  DTS integration enabled - will query for file resources")
 
-    df = pd.read_excel(xlsx_path, sheet_name=sheet_name)
+    df = read_sheet(xlsx_path, sheet_name)
     print(f"Found {len(df)} {label} in {sheet_name} sheet")
 
     if limit is not None:
@@ -278,57 +558,150 @@ def load_sheet(
     dts_resources_found = 0
     dts_resources_total = 0
 
-    for idx, row in df.iterrows():
-        folder_id = _to_folder_id(row[folder_col])
-        dts_id = _to_folder_id(row[dts_id_col])
-
-        # Convert row to a plain Python dict, handling NaN values
-        record = {}
-        for col in df.columns:
-            value = row[col]
-            if pd.isna(value):
-                record[col] = None
-            elif isinstance(value, (pd.Int64Dtype, int)):
-                record[col] = int(value)
-            elif isinstance(value, float):
-                record[col] = float(value)
+    # The DTS pool (producer) and the upload pool (consumer) form a pipeline:
+    # uploads are submitted as soon as a row's search result is available, and
+    # at most 2 * concurrency uploads are kept pending so memory stays bounded
+    # on the full 50k-row sheet.  The time this loop spends blocked on either
+    # stage shows how well the two overlap (reported with --verbose).
+    pending = {}
+    max_pending = 2 * concurrency
+    dts_wait = 0.0
+    upload_wait = 0.0
+    started = time.perf_counter()
+
+    # One paginated LIST of the destination instead of a request per object
+    suffix = COMPRESSION_SUFFIXES[compression] if compression else ""
+    existing = client.list_keys_set(BUCKET_NAME, dest_path + "/") if skip_existing else set()
+    skipped = 0
+    uploaded_keys = []
+
+    shards = {}
+    if shard_size:
+        shards_path = f"{dest_path}/{SHARDS_DIR}"
+        shards = {name: ShardWriter(shards_path, name, shard_size) for name in ('gems_info', 'resources')}
+
+    records = _sheet_records(df)
+    folder_ids = _to_folder_ids(df[folder_col])
+    dts_ids = _to_folder_ids(df[dts_id_col])
+    # Build every object key with one vectorised concat instead of per-row f-strings
+    folder_prefixes = f"{dest_path}/" + pd.Series(folder_ids, dtype=object).astype(str)
+    object_paths = (folder_prefixes + f"/gems_info.json{suffix}").tolist()
+    resources_paths = (folder_prefixes + f"/resources.json{suffix}").tolist()
+
+    # Ticked on this thread as each upload is drained, so the count reflects
+    # finished uploads rather than submissions; tqdm throttles its redraws.
+    # Shard mode has no per-record objects, so only shard uploads are counted.
+    expected = None
+    if not shards:
+        expected = len(records) + (sum(1 for dts_id in dts_ids if dts_id) if dts_client and orcid else 0)
+    progress = tqdm(total=expected, unit='obj', desc=f"  Uploading {label}", disable=dry_run)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool, \
+            ThreadPoolExecutor(max_workers=dts_concurrency) as dts_pool:
+        # Start every DTS search up front so searches overlap with uploads
+        dts_futures = {}
+        if dts_client and orcid:
+            dts_futures = _submit_dts_queries(dts_pool, dts_ids, dts_client, orcid, verbose=verbose)
+
+        def _on_result(key, written):
+            nonlocal skipped
+            progress.update(1)
+            # A conditional PUT returns False when another writer got there first
+            if written:
+                uploaded_keys.append(key)
             else:
-                record[col] = str(value)
-
-        object_path = f"{dest_path}/{folder_id}/gems_info.json"
-
-        if dry_run:
-            print(f"  [DRY RUN] Would upload: {object_path}")
-        else:
-            client.put_json_object(BUCKET_NAME, object_path, record)
-            if (idx + 1) % 100 == 0:
-                print(f"  Uploaded {idx + 1}/{len(df)} {label}...")
-
-        if dts_client and orcid and dts_id:
-            dts_queries += 1
-            resources = query_dts_resources(dts_id, dts_client, orcid, verbose=verbose)
-            if resources:
-                dts_resources_found += 1
-                dts_resources_total += len(resources)
-
-            filtered_files = _filter_resources(resources, dts_id)
-
-            resources_data = {
-                "IMG_TAXON_ID": int(dts_id),
-                "associated_files": resources,
-                "filtered_files": filtered_files,
-            }
-
-            resources_path = f"{dest_path}/{folder_id}/resources.json"
+                skipped += 1
+
+        def _submit(fn, bucket, key, *args, **kwargs):
+            nonlocal upload_wait
+            future = pool.submit(fn, bucket, key, *args, **kwargs)
+            pending[future] = key
+            upload_wait += _drain(pending, max_pending, _on_result)
+
+        def _submit_shard(shard):
+            if shard is None:
+                return
+            shard_key, body = shard
             if dry_run:
-                print(f"  [DRY RUN] Would upload resources.json ({len(resources)} files) to: {resources_path}")
+                print(f"  [DRY RUN] Would upload shard: {shard_key}")
             else:
-                client.put_json_object(BUCKET_NAME, resources_path, resources_data)
-
+                _submit(client.put_bytes, BUCKET_NAME, shard_key, body, content_type=NDJSON_CONTENT_TYPE)
+
+        try:
+            rows = zip(folder_ids, dts_ids, records, object_paths, resources_paths)
+            for folder_id, dts_id, record, object_path, resources_path in rows:
+                if shards:
+                    _submit_shard(shards['gems_info'].add(folder_id, record))
+                elif object_path in existing:
+                    skipped += 1
+                    progress.update(1)
+                elif dry_run:
+                    print(f"  [DRY RUN] Would upload: {object_path}")
+                else:
+                    _submit(client.put_json_object, BUCKET_NAME, object_path, record,
+                            if_absent=skip_existing, compression=compression)
+
+                if dts_client and orcid and dts_id:
+                    dts_queries += 1
+                    wait_start = time.perf_counter()
+                    resources = dts_futures[dts_id].result()
+                    dts_wait += time.perf_counter() - wait_start
+                    if resources:
+                        dts_resources_found += 1
+                        dts_resources_total += len(resources)
+
+                    filtered_files = _filter_resources(resources, dts_id)
+
+                    resources_data = {
+                        "IMG_TAXON_ID": int(dts_id),
+                        "associated_files": resources,
+                        "filtered_files": filtered_files,
+                    }
+
+                    if shards:
+                        _submit_shard(shards['resources'].add(folder_id, resources_data))
+                    elif resources_path in existing:
+                        skipped += 1
+                        progress.update(1)
+                    elif dry_run:
+                        print(f"  [DRY RUN] Would upload resources.json ({len(resources)} files) to: {resources_path}")
+                    else:
+                        _submit(client.put_json_object, BUCKET_NAME, resources_path, resources_data,
+                                if_absent=skip_existing, compression=compression)
+
+            for writer in shards.values():
+                _submit_shard(writer.flush())
+
+            # Wait for the remaining uploads and surface any error
+            upload_wait += _drain(pending, 1, _on_result)
+
+            # The index is written last, once every shard it points to exists
+            if shards:
+                index_path = f"{shards_path}/index.json"
+                if dry_run:
+                    print(f"  [DRY RUN] Would upload shard index: {index_path}")
+                else:
+                    client.put_json_object(BUCKET_NAME, index_path,
+                                           {name: writer.index for name, writer in shards.items()})
+                    uploaded_keys.append(index_path)
+        finally:
+            # Drop searches that never started if the load is aborted
+            for future in dts_futures.values():
+                future.cancel()
+            progress.close()
+
+    if skipped:
+        print(f"  Skipped {skipped} object(s) already present in {BUCKET_NAME}:{dest_path}/")
     if not dry_run:
-        print(f"✓ Successfully uploaded {len(df)} {label} to {BUCKET_NAME}:{dest_path}/")
+        print(f"✓ Successfully uploaded {len(uploaded_keys)} object(s) for {len(df)} {label} to {BUCKET_NAME}:{dest_path}/")
         if dts_client and orcid:
             print(f"  DTS: Queried {dts_queries} {label}, found resources for {dts_resources_found} ({dts_resources_total} total files)")
+        if verbose:
+            elapsed = time.perf_counter() - started
+            print(f"  Pipeline: {elapsed:.1f}s elapsed, {dts_wait:.1f}s waiting on DTS, "
+                  f"{upload_wait:.1f}s waiting on uploads")
+
+    return uploaded_keys
 
 
 def main():
@@ -362,6 +735,24 @@ def main():
         metavar='N',
         help='Limit processing to first N records from each sheet (for testing)'
     )
+    parser.add_argument(
+        '--skip-existing',
+        action='store_true',
+        help='Do not overwrite objects that already exist in MinIO (resume an interrupted load)'
+    )
+    parser.add_argument(
+        '--shard-size',
+        type=int,
+        metavar='N',
+        help='Pack records into NDJSON shards of N records (plus an index.json) '
+             'instead of uploading one JSON object per record'
+    )
+    parser.add_argument(
+        '--compression',
+        choices=sorted(COMPRESSION_SUFFIXES),
+        help='Compress each JSON object with this encoding (stored as Content-Encoding, '
+             'with the matching key suffix, e.g. gems_info.json.gz)'
+    )
     parser.add_argument(
         '--dts-token',
         type=str,
@@ -379,11 +770,30 @@ def main():
         action='store_true',
         help='Skip DTS queries for file resources (only upload metadata)'
     )
+    parser.add_argument(
+        '--dts-concurrency',
+        type=int,
+        default=DEFAULT_DTS_CONCURRENCY,
+        metavar='N',
+        help=f'Maximum number of concurrent DTS searches (default: {DEFAULT_DTS_CONCURRENCY})'
+    )
+    parser.add_argument(
+        '--refresh-dts-cache',
+        action='store_true',
+        help=f'Ignore cached DTS results ({DTS_CACHE_FILENAME} in the data directory) and query DTS again'
+    )
     parser.add_argument(
         '--verbose',
         action='store_true',
         help='Enable verbose logging for DTS queries'
     )
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        metavar='N',
+        help=f'Maximum number of concurrent MinIO uploads (default: {DEFAULT_CONCURRENCY})'
+    )
     parser.add_argument(
         '--stats-output',
         type=str,
@@ -393,6 +803,12 @@ def main():
     )
     
     args = parser.parse_args()
+
+    if args.shard_size and args.skip_existing:
+        parser.error('--skip-existing cannot be combined with --shard-size')
+    if args.shard_size and args.compression:
+        # The shard index holds byte offsets into the uncompressed NDJSON
+        parser.error('--compression cannot be combined with --shard-size')
     
     # Ensure data directory exists
     args.data_dir.mkdir(parents=True, exist_ok=True)
@@ -409,7 +825,9 @@ def main():
     
     # Initialize MinIO client
     print("\nConnecting to MinIO...")
-    client = MinioClient()
+    # Size the connection pool to the upload concurrency (plus headroom for
+    # the part uploads of multipart payloads) so no worker waits on a socket.
+    client = MinioClient(max_pool_connections=max(args.concurrency + 8, 64))
     
     # Check that parent paths exist
     check_parent_paths_exist(client)
@@ -441,34 +859,48 @@ def main():
     else:
         print("\nSkipping DTS integration (--skip-dts flag set)")
     
-    # Stats-only mode
-    if args.stats_output:
-        if not (dts_client and args.dts_orcid):
-            print("Error: --stats-output requires DTS credentials (--dts-token and --dts-orcid).")
-            sys.exit(1)
-        print("\nCollecting stats for S1 metagenomes...")
-        metagenome_stats = collect_sheet_stats(
-            xlsx_path, sheet_name='S1', folder_col='IMG_TAXON_ID', dts_id_col='IMG_TAXON_ID',
-            dts_client=dts_client, orcid=args.dts_orcid, limit=args.limit, verbose=args.verbose,
-        )
-        print("\nCollecting stats for S2 MAGs...")
-        mag_stats = collect_sheet_stats(
-            xlsx_path, sheet_name='S2', folder_col='genome_id', dts_id_col='img_taxon_id',
-            dts_client=dts_client, orcid=args.dts_orcid, limit=args.limit, verbose=args.verbose,
-        )
-        write_stats_xlsx(args.stats_output, metagenome_stats, mag_stats)
-        print("\n✓ All done!")
-        return
+    dts_cache_path = args.data_dir / DTS_CACHE_FILENAME
+    if dts_client and not args.refresh_dts_cache:
+        load_dts_cache(dts_cache_path)
 
-    # Load data
-    shared = dict(dry_run=args.dry_run, limit=args.limit,
-                  dts_client=dts_client, orcid=args.dts_orcid, verbose=args.verbose)
-    load_sheet(client, xlsx_path, sheet_name='S1', label='metagenomes',
-               dest_path=METAGENOMES_PATH, folder_col='IMG_TAXON_ID', dts_id_col='IMG_TAXON_ID', **shared)
-    load_sheet(client, xlsx_path, sheet_name='S2', label='MAGs',
-               dest_path=MAGS_PATH, folder_col='genome_id', dts_id_col='img_taxon_id', **shared)
+    try:
+        # Stats-only mode
+        if args.stats_output:
+            if not (dts_client and args.dts_orcid):
+                print("Error: --stats-output requires DTS credentials (--dts-token and --dts-orcid).")
+                sys.exit(1)
+            print("\nCollecting stats for S1 metagenomes...")
+            metagenome_stats = collect_sheet_stats(
+                xlsx_path, sheet_name='S1', folder_col='IMG_TAXON_ID', dts_id_col='IMG_TAXON_ID',
+                dts_client=dts_client, orcid=args.dts_orcid, limit=args.limit, verbose=args.verbose,
+                dts_concurrency=args.dts_concurrency,
+            )
+            print("\nCollecting stats for S2 MAGs...")
+            mag_stats = collect_sheet_stats(
+                xlsx_path, sheet_name='S2', folder_col='genome_id', dts_id_col='img_taxon_id',
+                dts_client=dts_client, orcid=args.dts_orcid, limit=args.limit, verbose=args.verbose,
+                dts_concurrency=args.dts_concurrency,
+            )
+            write_stats_xlsx(args.stats_output, metagenome_stats, mag_stats)
+            print("\n✓ All done!")
+            return
+
+        # Load data
+        shared = dict(dry_run=args.dry_run, limit=args.limit,
+                      dts_client=dts_client, orcid=args.dts_orcid, verbose=args.verbose,
+                      concurrency=args.concurrency, dts_concurrency=args.dts_concurrency,
+                      skip_existing=args.skip_existing, shard_size=args.shard_size,
+                      compression=args.compression)
+        load_sheet(client, xlsx_path, sheet_name='S1', label='metagenomes',
+                   dest_path=METAGENOMES_PATH, folder_col='IMG_TAXON_ID', dts_id_col='IMG_TAXON_ID', **shared)
+        load_sheet(client, xlsx_path, sheet_name='S2', label='MAGs',
+                   dest_path=MAGS_PATH, folder_col='genome_id', dts_id_col='img_taxon_id', **shared)
 
-    print("\n✓ All done!")
+        print("\n✓ All done!")
+    finally:
+        # Saved even on failure so a re-run skips the searches already done
+        if dts_client:
+            save_dts_cache(dts_cache_path)
 
 
 if __name__ == '__main__':
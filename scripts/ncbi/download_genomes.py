@@ -3,30 +3,51 @@
 Download genome files (.fna.gz and .gff.gz) from NCBI for accessions in a list.
 """
 
+import io
 import os
 import sys
 import re
 import json
-import shutil
+import queue
 import threading
+from collections import deque
+from contextlib import contextmanager
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from ftplib import FTP, error_temp
+from ftplib import FTP, error_perm, error_temp
 from pathlib import Path
-import tempfile
 import hashlib
 import logging
 import argparse
 import socket
 import time
 from datetime import datetime
+from html.parser import HTMLParser
+from urllib.parse import unquote
 
+import requests
 from frictionless import Package
 
 from kbase_transfers import MinioClient
+from kbase_transfers.minio_client import stream_transfer_config
 
 minio_bucket = "cdm-lake"
 minio_path_prefix = "tenant-general-warehouse/kbase/datasets/ncbi/"
 
+# Accession / path patterns, compiled once (prefix runs parse thousands of paths)
+_ENTRY_RE = re.compile(r'(GB|RS)_(GC[AF])_([\d.]+)')
+_ACCESSION_RE = re.compile(r'(GC[AF])_([\d.]+)')
+_ACCESSION_DIGITS_RE = re.compile(r'GC[AF]_(\d{3})(\d{3})(\d{3})\.\d+')
+_ASSEMBLY_DIR_RE = re.compile(r'^GC[AF]_\d{9}\.\d+_.*')
+_ASSEMBLY_PATH_RE = re.compile(r'/(GC[AF])/\d{3}/\d{3}/\d{3}/((GC[AF]_\d{9}\.\d+)_[^/]+)/')
+_ACCESSION_FROM_PATH_RE = re.compile(r'/(GC[AF]_\d{9}\.\d+)_[^/]+/')
+# Scheme and host of a URL, e.g. "https://ftp.ncbi.nlm.nih.gov"
+_URL_PATH_RE = re.compile(r'^[a-z]+://[^/]+')
+# ls-style LIST line with at least 9 fields: captures the type flag and the last field
+_LIST_LINE_RE = re.compile(r'^(\S)\S*(?:\s+\S+){7,}\s+(\S+)\s*$')
+
+# Seconds a control connection may sit idle before a NOOP is sent on it
+FTP_NOOP_IDLE = 25
+
 # Set up logging
 logger = logging.getLogger(__name__)
 
@@ -93,20 +114,254 @@ def _set_ftp_keepalive(ftp, idle=30, interval=10, count=3):
         sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, count)
 
 
-def get_minio_client():
+def _ftp_connect(ftp_host):
+    """Open and log in an anonymous FTP connection with keepalive enabled."""
+    ftp = FTP(ftp_host)
+    ftp.login()
+    _set_ftp_keepalive(ftp)  # Prevent '421 No transfer timeout' on long transfers
+    _touch_ftp(ftp)
+    return ftp
+
+
+def _touch_ftp(ftp):
+    """Record protocol activity on this control connection."""
+    # Stored on the connection itself: a connection is only ever used by the
+    # thread that checked it out, so no other thread reads or writes it
+    ftp.last_activity = time.monotonic()
+
+
+def _ftp_keepalive(ftp, idle=FTP_NOOP_IDLE):
+    """Send NOOP if this connection has had no traffic for ``idle`` seconds.
+
+    Cloud NAT gateways kill idle TCP connections after ~60 s even with TCP
+    keepalive; an FTP NOOP is application-layer traffic that resets every
+    NAT/firewall timer.  Use before a potentially slow MinIO operation.
+    """
+    if time.monotonic() - getattr(ftp, 'last_activity', 0.0) <= idle:
+        return
+    try:
+        ftp.sendcmd('NOOP')
+        _touch_ftp(ftp)
+        logger.debug("  Sent FTP NOOP to keep control connection alive")
+    except Exception as noop_err:
+        logger.warning(f"  FTP NOOP failed: {noop_err}")
+
+
+class _AutoindexParser(HTMLParser):
+    """Collect entry links from an Apache-style directory index page."""
+
+    def __init__(self):
+        super().__init__()
+        self.entries = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag != 'a':
+            return
+        href = dict(attrs).get('href') or ''
+        # Skip sort links, the parent directory and absolute links
+        if not href or href.startswith(('?', '/', '.', '#')) or '://' in href:
+            return
+        self.entries.append(unquote(href))
+
+
+class HTTPSConnection:
+    """
+    Read-only stand-in for an ftplib.FTP connection over HTTPS.
+
+    NCBI serves the same tree at https://<ftp host>/.  This implements the
+    subset of the FTP API used in this module (mlsd, cwd, NLST/RETR through
+    retrlines/retrbinary, NOOP) on a requests.Session, whose kept-alive
+    connection replaces the FTP control/data connection pair.  A missing
+    path raises error_perm (550) and a server-side failure raises error_temp
+    (4xx), so callers handle errors exactly as they do for FTP.
+    """
+
+    def __init__(self, host, timeout=60):
+        self.host = host
+        self.timeout = timeout
+        self.session = requests.Session()
+        self._cwd = '/'
+
+    def _url(self, path):
+        if not path.startswith('/'):
+            path = self._cwd.rstrip('/') + '/' + path
+        return f"https://{self.host}{path}"
+
+    def _get(self, path, stream=False):
+        try:
+            response = self.session.get(self._url(path), stream=stream, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise error_temp(f"421 {e}") from e
+        if response.status_code == 404:
+            response.close()
+            raise error_perm(f"550 {path}: No such file or directory")
+        if response.status_code >= 400:
+            response.close()
+            raise error_temp(f"451 {path}: HTTP {response.status_code}")
+        return response
+
+    def _list(self, path):
+        parser = _AutoindexParser()
+        parser.feed(self._get(path.rstrip('/') + '/').text)
+        return parser.entries
+
+    def voidcmd(self, cmd):
+        # Each request carries its own status; there is no session to ping
+        return '200 NOOP ok'
+
+    sendcmd = voidcmd
+
+    def cwd(self, path):
+        self._cwd = path if path.startswith('/') else self._cwd.rstrip('/') + '/' + path
+
+    def mlsd(self, path='', facts=()):
+        for entry in self._list(path or self._cwd):
+            name = entry.rstrip('/')
+            yield name, {'type': 'dir' if entry.endswith('/') else 'file'}
+
+    def retrlines(self, cmd, callback):
+        if cmd == 'NLST':
+            for entry in self._list(self._cwd):
+                callback(entry.rstrip('/'))
+            return '226 Transfer complete'
+        with self._get(cmd.removeprefix('RETR '), stream=True) as response:
+            for line in response.iter_lines(decode_unicode=False):
+                callback(line.decode('utf-8'))
+        return '226 Transfer complete'
+
+    def retrbinary(self, cmd, callback, blocksize=8192, rest=None):
+        with self._get(cmd.removeprefix('RETR '), stream=True) as response:
+            for chunk in response.iter_content(blocksize):
+                callback(chunk)
+        return '226 Transfer complete'
+
+    def quit(self):
+        self.session.close()
+
+    close = quit
+
+
+def _connect(ftp_host, transport='ftp'):
+    """Open a connection to ftp_host over the given transport ('ftp' or 'https')."""
+    if transport == 'https':
+        return HTTPSConnection(ftp_host)
+    return _ftp_connect(ftp_host)
+
+
+def _ftp_close(ftp):
+    """Close an FTP connection, ignoring errors from an already-dead socket."""
+    try:
+        ftp.quit()
+    except Exception:
+        # The control connection may have timed out after all work was
+        # completed (421 during QUIT); nothing is lost by dropping it.
+        ftp.close()
+
+
+class FTPPool:
+    """
+    Bounded pool of logged-in FTP connections shared by worker threads.
+    With ``transport='https'`` it pools HTTPSConnection objects instead.
+
+    Connecting and logging in costs several round trips to NCBI, so
+    connections are reused across assemblies instead of opened per call.
+    At most ``size`` connections are checked out at once.  An idle connection
+    is health-checked with NOOP on checkout and replaced if it has died, and
+    a connection whose holder raised is closed rather than returned, since
+    its control channel may be in an unknown state.
+    """
+
+    def __init__(self, ftp_host, size, transport='ftp'):
+        self.ftp_host = ftp_host
+        self.transport = transport
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _checkout(self):
+        while True:
+            try:
+                ftp = self._idle.get_nowait()
+            except queue.Empty:
+                return _connect(self.ftp_host, self.transport)
+            try:
+                ftp.voidcmd('NOOP')
+                _touch_ftp(ftp)
+                return ftp
+            except Exception:
+                logger.debug("  Dropping stale pooled FTP connection")
+                _ftp_close(ftp)
+
+    @contextmanager
+    def acquire(self):
+        """Check out a connection for the duration of a ``with`` block."""
+        with self._slots:
+            ftp = self._checkout()
+            try:
+                yield ftp
+            except BaseException:
+                _ftp_close(ftp)
+                raise
+            self._idle.put(ftp)
+
+    def close(self):
+        """Close every idle connection in the pool."""
+        while True:
+            try:
+                _ftp_close(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+class RateLimiter:
+    """
+    Thread-safe limiter spacing calls to acquire() at most ``rate`` per second.
+
+    All worker threads share one schedule, so the aggregate rate stays
+    capped however many threads are running; a thread only sleeps for the
+    time remaining until its reserved slot.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._lock = threading.Lock()
+        self._next_slot = time.monotonic()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+@contextmanager
+def _single_ftp_connection(ftp_host):
+    """A one-off FTP connection, closed when the ``with`` block exits."""
+    ftp = _ftp_connect(ftp_host)
+    try:
+        yield ftp
+    finally:
+        _ftp_close(ftp)
+
+
+def get_minio_client(max_pool_connections=None):
     """
     Initialize and return MinioClient.
+
+    Args:
+        max_pool_connections: Size of the client's HTTP connection pool; raise
+                              it when one client is shared by many threads.
     """
-    client = MinioClient()
+    client = MinioClient(max_pool_connections=max_pool_connections)
 
     # Ensure bucket exists
-    buckets = client.list_buckets()
-    if minio_bucket not in buckets:
+    if not client.bucket_exists(minio_bucket):
         raise Exception(f"MinIO bucket '{minio_bucket}' does not exist.")
     
-    # Ensure path prefix exists (not strictly necessary for MinIO/S3, but for sanity check)
-    objects = client.list_objects(minio_bucket, prefix=minio_path_prefix)
-    if not any(objects):
+    # Ensure path prefix exists (not strictly necessary for MinIO/S3, but for sanity check).
+    # prefix_exists asks for a single key, however many objects are under the prefix.
+    if not client.prefix_exists(minio_bucket, minio_path_prefix):
         raise Exception(f"MinIO path prefix '{minio_path_prefix}' does not exist in bucket '{minio_bucket}'.")
 
     return client
@@ -120,7 +375,7 @@ def parse_accession(entry):
     e.g., ('GB', 'GCA', 'GCA_000195005.1')
     """
     # Try full format first (GB_GCA_000195005.1)
-    match = re.match(r'(GB|RS)_(GC[AF])_([\d.]+)', entry.strip())
+    match = _ENTRY_RE.match(entry.strip())
     if match:
         prefix = match.group(1)
         database = match.group(2)  # GCA or GCF
@@ -129,7 +384,7 @@ def parse_accession(entry):
         return prefix, database, accession_full
     
     # Try accession-only format (GCA_000195005.1)
-    match = re.match(r'(GC[AF])_([\d.]+)', entry.strip())
+    match = _ACCESSION_RE.match(entry.strip())
     if match:
         database = match.group(1)
         accession_num = match.group(2)
@@ -145,7 +400,7 @@ def build_ftp_path(database, accession_full):
     e.g., GCA_000195005.1 -> /genomes/all/GCA/000/195/005/
     """
     # Extract numeric parts: GCA_000195005.1 -> ['000', '195', '005']
-    match = re.match(r'GC[AF]_(\d{3})(\d{3})(\d{3})\.\d+', accession_full)
+    match = _ACCESSION_DIGITS_RE.match(accession_full)
     if not match:
         raise ValueError(f"Cannot parse accession: {accession_full}")
     
@@ -160,7 +415,7 @@ def build_accession_path(assembly_dir):
     Build the NCBI path for a given assembly directory.
     e.g., GCA_000195005.1_MyRecordDescription -> GCA/000/195/005/GCA_000195005.1_MyRecordDescription/
     """
-    match = re.match(r'GC[AF]_(\d{3})(\d{3})(\d{3})\.\d+.*', assembly_dir)
+    match = _ACCESSION_DIGITS_RE.match(assembly_dir)
     if not match:
         raise ValueError(f"Cannot parse accession: {assembly_dir}")
     
@@ -170,23 +425,49 @@ def build_accession_path(assembly_dir):
     return path
 
 
+# Hosts that rejected MLSD; listings on them go straight to LIST
+_no_mlsd_hosts = set()
+
+
+def _list_dir(ftp, path):
+    """
+    List an FTP directory as (name, is_dir) pairs.
+
+    Uses MLSD, which takes an absolute path (no CWD round trip) and returns
+    machine-readable entry types, so directories are recognised without
+    parsing ls-style output.  Servers that do not implement MLSD fall back
+    to CWD + LIST, treating lines starting with 'd' as directories.
+    """
+    if ftp.host not in _no_mlsd_hosts:
+        try:
+            return [(name, facts.get('type') == 'dir') for name, facts in ftp.mlsd(path, facts=['type'])]
+        except error_perm as e:
+            # 5xx "command not understood/implemented"; anything else (e.g. 550
+            # no such directory) is a real error for the caller
+            if str(e)[:3] not in ('500', '501', '502', '504'):
+                raise
+            logger.debug(f"MLSD not supported by {ftp.host}, falling back to LIST: {e}")
+            _no_mlsd_hosts.add(ftp.host)
+
+    ftp.cwd(path)
+    lines = []
+    ftp.retrlines('LIST', lines.append)
+    matches = (_LIST_LINE_RE.match(line) for line in lines)
+    return [(m.group(2), m.group(1) == 'd') for m in matches if m]
+
+
 def find_assembly_dir(ftp, base_path, accession_full):
     """
     Find the actual assembly directory (with assembly name suffix).
     e.g., GCA_000195005.1_ASM19500v1
     """
     try:
-        ftp.cwd(base_path)
-        dirs = []
-        ftp.retrlines('LIST', lambda x: dirs.append(x))
-        
-        # Find directory that starts with our accession
-        for line in dirs:
-            parts = line.split()
-            if len(parts) >= 9:
-                name = parts[-1]
-                if name.startswith(accession_full):
-                    return name
+        # Find directory that starts with our accession.  Any entry type is
+        # accepted, as with the earlier LIST parsing, so a symlinked assembly
+        # directory is still found.
+        for name, _ in _list_dir(ftp, base_path):
+            if name.startswith(accession_full):
+                return name
         
         raise FileNotFoundError(f"No assembly directory found for {accession_full} in {base_path}")
     
@@ -194,6 +475,10 @@ def find_assembly_dir(ftp, base_path, accession_full):
         raise Exception(f"Error finding assembly directory: {e}")
 
 
+# Read size for FTP data transfers: fewer, larger chunks mean fewer Python
+# callbacks per file than ftplib's 8 KiB default.
+FTP_BLOCKSIZE = 1 << 16
+
 file_filters = [
     '_gene_ontology.gaf.gz',
     '_genomic.fna.gz',
@@ -207,18 +492,14 @@ file_filters = [
     '_normalized_gene_expression_counts.txt.gz',
 ]
 
-def compute_md5(file_path):
+def parse_md5checksum_line(line, checksums):
     """
-    Compute MD5 checksum of a file.
-
-    Uses 1 MiB read chunks to minimise the number of Python-level loop
-    iterations (and GIL acquisitions) for large files.
+    Parse one md5checksums.txt line ('<md5>  ./<filename>') into checksums.
+    Blank or malformed lines are ignored.
     """
-    md5_hash = hashlib.md5()
-    with open(file_path, 'rb') as f:
-        for chunk in iter(lambda: f.read(1 << 20), b""):
-            md5_hash.update(chunk)
-    return md5_hash.hexdigest()
+    parts = line.split()
+    if len(parts) >= 2:
+        checksums[parts[1].lstrip('./')] = parts[0]
 
 
 def parse_md5checksums(content):
@@ -227,13 +508,8 @@ def parse_md5checksums(content):
     Returns dict of {filename: checksum}
     """
     checksums = {}
-    for line in content.strip().split('\n'):
-        if line.strip():
-            parts = line.split()
-            if len(parts) >= 2:
-                checksum = parts[0]
-                filename = parts[1].lstrip('./')
-                checksums[filename] = checksum
+    for line in content.splitlines():
+        parse_md5checksum_line(line, checksums)
     return checksums
 
 
@@ -314,67 +590,134 @@ def create_frictionless_descriptor(assembly_dir, accession_full, downloaded_file
     return descriptor
 
 
-def find_assembly_directories_in_prefix(ftp, prefix_path, start_from=None, limit=None):
+def find_assembly_directories_in_prefix(ftp, prefix_path, start_from=None, limit=None, ftp_pool=None, concurrency=1):
     """
-    Recursively find all assembly directories under a given prefix.
+    Find all assembly directories under a given prefix.
     Returns list of full paths to assembly directories.
     e.g., /genomes/all/GCF/000/001/215/GCF_000001215.2_Release_5/
 
+    Directories are walked iteratively from a deque used as a stack, so
+    there is no recursion.  With an ftp_pool and concurrency > 1, up to
+    ``concurrency`` sibling directories are listed at once, each over its own
+    pooled connection.  The walk stays depth-first, so a small ``limit`` is
+    satisfied after listing a single branch rather than every directory on
+    the upper levels.
+
     Args:
-        ftp: Connected FTP instance.
+        ftp: Connected FTP instance (unused when ftp_pool is given).
         prefix_path: Base FTP path to search under.
         start_from: If set, skip top-level subdirectories whose names sort
                     before this value (alphanumeric comparison). Only applied
                     at the first level of subdirectories under prefix_path.
         limit: If set, stop collecting once this many assembly dirs are found.
+        ftp_pool: FTPPool to list directories through.
+        concurrency: Number of directories listed in parallel (needs ftp_pool).
     """
-    assembly_pattern = re.compile(r'^GC[AF]_\d{9}\.\d+_.*')
     assembly_dirs = []
 
-    def traverse_directory(path, skip_before=None):
-        if limit and len(assembly_dirs) >= limit:
-            return
+    def _list(path):
         logger.debug(f"Traversing: {path}")
         try:
-            ftp.cwd(path)
-            items = []
-            ftp.retrlines('LIST', lambda x: items.append(x))
-
-            for line in items:
-                if limit and len(assembly_dirs) >= limit:
-                    break
-
-                parts = line.split()
-                if len(parts) < 9:
-                    continue
-
-                name = parts[-1]
-                is_dir = line.startswith('d')
-
-                if not is_dir:
-                    continue
-
-                # At the top level, skip subdirectories that sort before start_from
-                if skip_before is not None and name < skip_before:
-                    logger.debug(f"  Skipping {name} (before start_from={skip_before})")
-                    continue
-
-                # Check if this is an assembly directory
-                if assembly_pattern.match(name):
-                    full_path = f"{path}{name}/"
-                    assembly_dirs.append(full_path)
-                    logger.debug(f"  Found assembly: {full_path}")
-                else:
-                    # Recurse into subdirectory (no skip_before for deeper levels)
-                    traverse_directory(f"{path}{name}/")
-
+            if ftp_pool:
+                with ftp_pool.acquire() as pooled_ftp:
+                    return _list_dir(pooled_ftp, path)
+            return _list_dir(ftp, path)
         except Exception as e:
             logger.warning(f"Error traversing {path}: {e}")
+            return []
+
+    width = concurrency if ftp_pool else 1
+    # (path, skip_before) pairs; the next directory to list is at the right end
+    pending = deque([(prefix_path, start_from)])
+    with ThreadPoolExecutor(max_workers=width) as executor:
+        while pending and not (limit and len(assembly_dirs) >= limit):
+            batch = [pending.pop() for _ in range(min(width, len(pending)))]
+            listings = executor.map(_list, [path for path, _ in batch])
+
+            subdirs = []
+            for (path, skip_before), entries in zip(batch, listings):
+                for name, is_dir in entries:
+                    if limit and len(assembly_dirs) >= limit:
+                        break
+
+                    if not is_dir:
+                        continue
+
+                    # At the top level, skip subdirectories that sort before start_from
+                    if skip_before is not None and name < skip_before:
+                        logger.debug(f"  Skipping {name} (before start_from={skip_before})")
+                        continue
+
+                    # Check if this is an assembly directory
+                    if _ASSEMBLY_DIR_RE.match(name):
+                        full_path = f"{path}{name}/"
+                        assembly_dirs.append(full_path)
+                        logger.debug(f"  Found assembly: {full_path}")
+                    else:
+                        # Descend later (no skip_before for deeper levels)
+                        subdirs.append((f"{path}{name}/", None))
+
+            # Reversed so the first subdirectory is listed next
+            pending.extend(reversed(subdirs))
 
-    traverse_directory(prefix_path, skip_before=start_from)
     return assembly_dirs
 
 
+def find_assembly_directories_from_summary(ftp, prefix_path, start_from=None, limit=None):
+    """
+    Find assembly directories under a prefix from NCBI's assembly summary.
+
+    A single download of ``/genomes/{refseq,genbank}/assembly_summary_*.txt``
+    replaces the thousands of directory listings of an FTP walk.  The summary
+    only covers current assemblies, so suppressed or replaced ones that
+    still have a directory under /genomes/all/ are not returned.
+    Returns paths in the same form as find_assembly_directories_in_prefix.
+
+    Args:
+        ftp: Connected FTP instance.
+        prefix_path: Base FTP path, e.g. ``/genomes/all/GCF/000/``.
+        start_from: If set, skip top-level subdirectories under prefix_path
+                    whose names sort before this value.
+        limit: If set, return at most this many assembly dirs.
+    """
+    relative = prefix_path.split('/genomes/all/', 1)[-1].strip('/')
+    database = {'GCF': 'refseq', 'GCA': 'genbank'}.get(relative[:3])
+    if database is None:
+        raise ValueError(f"Cannot pick an assembly summary for prefix: {prefix_path}")
+    summary_path = f"/genomes/{database}/assembly_summary_{database}.txt"
+    root = f"/genomes/all/{relative}/"
+
+    assembly_dirs = []
+    column = None
+    header = None
+
+    def _on_line(line):
+        nonlocal column, header
+        if line.startswith('#'):
+            # The last comment line is the tab-separated column header
+            header = line.lstrip('#').split('\t')
+            return
+        if column is None:
+            if not header or 'ftp_path' not in header:
+                raise ValueError(f"No ftp_path column in the header of assembly summary: {summary_path}")
+            column = header.index('ftp_path')
+        fields = line.split('\t')
+        if len(fields) <= column:
+            return
+        # ftp_path is a full URL (or "na"); keep only its path
+        path = _URL_PATH_RE.sub('', fields[column]).rstrip('/') + '/'
+        if not path.startswith(root):
+            return
+        if start_from is not None and path[len(root):].split('/', 1)[0] < start_from:
+            return
+        assembly_dirs.append(path)
+
+    logger.info(f"Reading assembly summary: {summary_path}")
+    ftp.retrlines(f'RETR {summary_path}', _on_line)
+    assembly_dirs.sort()
+    return assembly_dirs[:limit] if limit else assembly_dirs
+
+
 def list_ftp_subdirectories(ftp, path, start_from=None):
     """
     List direct subdirectories of an FTP path, optionally filtering to those
@@ -383,35 +726,28 @@ def list_ftp_subdirectories(ftp, path, start_from=None):
     Returns a sorted list of subdirectory names (not full paths).
     """
     try:
-        ftp.cwd(path)
-        items = []
-        ftp.retrlines('LIST', lambda x: items.append(x))
-        subdirs = []
-        for line in items:
-            parts = line.split()
-            if len(parts) < 9:
-                continue
-            if not line.startswith('d'):
-                continue
-            name = parts[-1]
-            if start_from is not None and name < start_from:
-                continue
-            subdirs.append(name)
+        subdirs = [
+            name for name, is_dir in _list_dir(ftp, path)
+            if is_dir and (start_from is None or name >= start_from)
+        ]
         return sorted(subdirs)
     except Exception as e:
         logger.error(f"Error listing subdirectories of {path}: {e}")
         return []
 
 
-def download_genome_files(entry, s3_client, local_dir, failed_transfers, no_checksum_files, ftp_host='ftp.ncbi.nlm.nih.gov', assembly_path=None):
+def download_genome_files(entry, s3_client, failed_transfers, no_checksum_files, ftp_host='ftp.ncbi.nlm.nih.gov', assembly_path=None, ftp_pool=None, file_threads=1):
     """
     Download files according to file_filters for a given accession.
     If assembly_path is provided, use it directly instead of building from entry.
+    If ftp_pool is provided, a pooled connection is used instead of a new one.
+    With file_threads > 1, up to that many files are transferred at once,
+    each over its own FTP connection.
     """
     if assembly_path:
         # Extract database and accession from path
         # e.g., /genomes/all/GCF/000/001/215/GCF_000001215.2_Release_5/
-        match = re.search(r'/(GC[AF])/\d{3}/\d{3}/\d{3}/((GC[AF]_\d{9}\.\d+)_[^/]+)/', assembly_path)
+        match = _ASSEMBLY_PATH_RE.search(assembly_path)
         if not match:
             raise ValueError(f"Cannot parse assembly path: {assembly_path}")
         database = match.group(1)
@@ -422,279 +758,271 @@ def download_genome_files(entry, s3_client, local_dir, failed_transfers, no_chec
     else:
         _, database, accession_full = parse_accession(entry)
     
-    # Ensure local_dir is a Path object
-    local_dir = Path(local_dir)
-    
     logger.info(f"\nProcessing: {entry}")
     logger.info(f"  Accession: {accession_full}")
-    logger.debug(f"  Local temporary dir: {local_dir}")
     
     # Connect to FTP
-    ftp = FTP(ftp_host)
-    ftp.login()
-    _set_ftp_keepalive(ftp)  # Prevent '421 No transfer timeout' on long transfers
-    
-    try:
-        # Build path and find assembly directory (if not already provided)
-        if not assembly_path:
-            base_path = build_ftp_path(database, accession_full)
-            logger.info(f"  Base path: {base_path}")
+    connection = ftp_pool.acquire() if ftp_pool else _single_ftp_connection(ftp_host)
+    with connection as ftp:
+        try:
+            # Build path and find assembly directory (if not already provided)
+            if not assembly_path:
+                base_path = build_ftp_path(database, accession_full)
+                logger.info(f"  Base path: {base_path}")
             
-            assembly_dir = find_assembly_dir(ftp, base_path, accession_full)
-            logger.info(f"  Assembly dir: {assembly_dir}")
-        else:
-            logger.info(f"  Using provided path: {assembly_path}")
+                assembly_dir = find_assembly_dir(ftp, base_path, accession_full)
+                logger.info(f"  Assembly dir: {assembly_dir}")
+            else:
+                logger.info(f"  Using provided path: {assembly_path}")
 
-        s3_path = minio_path_prefix + build_accession_path(assembly_dir)
-        logger.info(f"  S3 path: {s3_path}")
+            s3_path = minio_path_prefix + build_accession_path(assembly_dir)
+            logger.info(f"  S3 path: {s3_path}")
         
-        # Path for metadata (stored separately from raw data)
-        metadata_path = minio_path_prefix + "metadata/"
-        metadata_filename = f"{assembly_dir}_datapackage.json"
+            # Path for metadata (stored separately from raw data)
+            metadata_path = minio_path_prefix + "metadata/"
+            metadata_filename = f"{assembly_dir}_datapackage.json"
         
-        full_path = base_path + assembly_dir
-        ftp.cwd(full_path)
+            # Files are addressed by absolute path, so no connection (this one
+            # or a file worker's) needs a CWD into the assembly directory
+            full_path = base_path + assembly_dir + '/'
         
-        # List files
-        files = []
-        ftp.retrlines('NLST', lambda x: files.append(x))
+            # List files
+            files = [name for name, is_dir in _list_dir(ftp, full_path) if not is_dir]
         
-        # Download and parse md5checksums.txt first
-        md5_checksums = {}
-        if 'md5checksums.txt' in files:
-            logger.info(f"  Downloading md5checksums.txt")
-            md5_content = []
-            ftp.retrlines('RETR md5checksums.txt', lambda x: md5_content.append(x))
-            md5_checksums = parse_md5checksums('\n'.join(md5_content))
-            logger.info(f"  Found {len(md5_checksums)} checksums")
+            # Download and parse md5checksums.txt first
+            md5_checksums = {}
+            if 'md5checksums.txt' in files:
+                logger.info(f"  Downloading md5checksums.txt")
+                # The file is small: fetch it in binary mode into memory (one
+                # callback per block rather than per line) and upload those
+                # same bytes, with no local copy
+                buf = io.BytesIO()
+                ftp.retrbinary(f'RETR {full_path}md5checksums.txt', buf.write, blocksize=FTP_BLOCKSIZE)
+                md5_content = buf.getvalue()
+                md5_checksums = parse_md5checksums(md5_content.decode('utf-8'))
+                logger.info(f"  Found {len(md5_checksums)} checksums")
             
-            # Upload md5checksums.txt to MinIO
-            md5_local_file = local_dir / 'md5checksums.txt'
-            with open(md5_local_file, 'w') as f:
-                f.write('\n'.join(md5_content))
-            s3_client.upload_file(
-                minio_bucket,
-                s3_path + 'md5checksums.txt',
-                str(md5_local_file)
-            )
-            logger.info(f"  Uploaded md5checksums.txt to MinIO: {s3_path}md5checksums.txt")
-        else:
-            logger.warning(f"  WARNING: md5checksums.txt not found")
+                # Upload md5checksums.txt to MinIO
+                s3_client.put_bytes(
+                    minio_bucket,
+                    s3_path + 'md5checksums.txt',
+                    md5_content,
+                    content_type='text/plain'
+                )
+                logger.info(f"  Uploaded md5checksums.txt to MinIO: {s3_path}md5checksums.txt")
+            else:
+                logger.warning(f"  WARNING: md5checksums.txt not found")
         
-        # Filter for files based on file_filters
-        target_files = [f for f in files if any(f.endswith(suffix) for suffix in file_filters)]
+            # Filter for files based on file_filters
+            target_files = [f for f in files if any(f.endswith(suffix) for suffix in file_filters)]
         
-        if not target_files:
-            logger.warning(f"  WARNING: No files matching filters found")
-            return
+            if not target_files:
+                logger.warning(f"  WARNING: No files matching filters found")
+                return
         
-        # Download files and track successful downloads
-        downloaded_resources = []
-        # Track last FTP protocol activity to send NOOP before long MinIO operations.
-        # Cloud NAT gateways kill idle TCP connections after ~60 s even with TCP keepalive;
-        # an FTP NOOP is application-layer traffic that resets every NAT/firewall timer.
-        last_ftp_activity = time.monotonic()
+            # Object key and expected checksum for each file, computed once
+            targets = [(filename, s3_path + filename, md5_checksums.get(filename)) for filename in target_files]
+
+            # One listing of the assembly's MinIO prefix gives existence, size and
+            # ETag for every file, instead of a HEAD request per file
+            existing_objects = s3_client.stat_prefix(minio_bucket, s3_path)
+
+            # The listing and md5checksums.txt fetch just used this connection
+            _touch_ftp(ftp)
         
-        for filename in target_files:
-            # If the FTP control connection has been idle for too long, ping it with NOOP
-            # before performing a potentially slow MinIO HEAD request.
-            if time.monotonic() - last_ftp_activity > 25:
-                try:
-                    ftp.sendcmd('NOOP')
-                    last_ftp_activity = time.monotonic()
-                    logger.debug("  Sent FTP NOOP to keep control connection alive")
-                except Exception as noop_err:
-                    logger.warning(f"  FTP NOOP failed: {noop_err}")
-            # Single HEAD request: tells us whether the file exists AND its stored md5
-            obj_info = s3_client.stat_object(minio_bucket, s3_path + filename)
-            file_exists = obj_info is not None
-
-            local_file = local_dir / filename
-            expected_checksum = md5_checksums.get(filename)
+            def _transfer_file(ftp, target):
+                """Verify or transfer one file. Returns its resource dict, or None if it failed."""
+                filename, s3_key, expected_checksum = target
+                # Each worker holds its own connection, so idleness is tracked
+                # per connection; ping it before a potentially slow MinIO request
+                _ftp_keepalive(ftp)
+                obj_info = existing_objects.get(filename)
+                file_exists = obj_info is not None
             
-            # If file exists in MinIO and we have a checksum, verify it first
-            if file_exists and expected_checksum:
-                logger.info(f"  File exists in MinIO, verifying: {filename}")
-                # Fast path: check stored metadata checksum (no download needed)
-                if obj_info and obj_info.get('md5') == expected_checksum:
-                    logger.info(f"    ✓ Checksum verified via metadata, skipping download: {expected_checksum}")
-                    resource = {
-                        "name": filename,
-                        "path": s3_path + filename,
-                        "format": filename.split('.')[-1] if '.' in filename else "unknown",
-                        "bytes": obj_info.get('size'),
-                        "hash": expected_checksum
-                    }
-                    downloaded_resources.append(resource)
-                    continue
-                # Slow path: download and compute MD5 locally
-                s3_client.download_file(
-                    minio_bucket,
-                    s3_path + filename,
-                    str(local_file)
-                )
-                actual_checksum = compute_md5(local_file)
-                if actual_checksum == expected_checksum:
-                    logger.info(f"    ✓ Checksum verified, skipping download: {actual_checksum}")
-                    # Backfill metadata so future runs use the fast path.
-                    # Use a server-side copy (no data transfer) to update metadata only.
-                    backfilled = s3_client.update_metadata(
-                        minio_bucket,
-                        s3_path + filename,
-                        {'md5': actual_checksum}
-                    )
-                    if backfilled:
-                        logger.debug(f"    Backfilled md5 metadata for: {filename}")
+                # If file exists in MinIO and we have a checksum, verify it first
+                if file_exists and expected_checksum:
+                    logger.info(f"  File exists in MinIO, verifying: {filename}")
+                    # Fast path: check the ETag, which is the content MD5 for
+                    # single-part uploads, then the stored metadata checksum
+                    # (one HEAD request; needed for multipart uploads).  No
+                    # download needed either way.
+                    etag = obj_info['etag']
+                    verified = '-' not in etag and etag == expected_checksum
+                    stored_md5 = None
+                    if not verified:
+                        head = s3_client.stat_object(minio_bucket, s3_key)
+                        stored_md5 = head.get('md5') if head else None
+                        verified = stored_md5 == expected_checksum
+                    if verified:
+                        logger.info(f"    ✓ Checksum verified via metadata/ETag, skipping download: {expected_checksum}")
+                        resource = {
+                            "name": filename,
+                            "path": s3_key,
+                            "format": filename.split('.')[-1] if '.' in filename else "unknown",
+                            "bytes": obj_info.get('size'),
+                            "hash": expected_checksum
+                        }
+                        return resource
+                    if stored_md5:
+                        # The md5 stored at upload time was verified then, so a
+                        # different value means the NCBI file has changed; no
+                        # need to download and re-hash the MinIO copy to know
+                        logger.warning(f"    ✗ Stored checksum differs: expected {expected_checksum}, stored {stored_md5}")
+                        logger.info(f"    Will re-download from NCBI")
                     else:
-                        logger.warning(f"    Could not backfill md5 metadata for: {filename}")
-                    file_size = local_file.stat().st_size
+                        # Slow path: no stored md5 (legacy upload), so hash
+                        # the object as it streams back from MinIO
+                        actual_checksum = s3_client.object_md5(minio_bucket, s3_key)
+                        if actual_checksum == expected_checksum:
+                            logger.info(f"    ✓ Checksum verified, skipping download: {actual_checksum}")
+                            # Backfill metadata so future runs use the fast path.
+                            # Use a server-side copy (no data transfer) to update metadata only.
+                            backfilled = s3_client.update_metadata(
+                                minio_bucket,
+                                s3_key,
+                                {'md5': actual_checksum}
+                            )
+                            if backfilled:
+                                logger.debug(f"    Backfilled md5 metadata for: {filename}")
+                            else:
+                                logger.warning(f"    Could not backfill md5 metadata for: {filename}")
+                            file_size = obj_info['size']
+                            resource = {
+                                "name": filename,
+                                "path": s3_key,
+                                "format": filename.split('.')[-1] if '.' in filename else "unknown",
+                                "bytes": file_size,
+                                "hash": actual_checksum
+                            }
+                            return resource
+                        else:
+                            logger.warning(f"    ✗ Checksum mismatch in MinIO: expected {expected_checksum}, got {actual_checksum}")
+                            logger.info(f"    Will re-download from NCBI")
+                elif file_exists:
+                    logger.info(f"  File exists in MinIO (no checksum available): {filename}")
+                    # obj_info already contains size from the listing above
+                    file_size = obj_info['size']
                     resource = {
                         "name": filename,
-                        "path": s3_path + filename,
+                        "path": s3_key,
                         "format": filename.split('.')[-1] if '.' in filename else "unknown",
                         "bytes": file_size,
-                        "hash": actual_checksum
+                        "hash": None
                     }
-                    downloaded_resources.append(resource)
-                    continue
-                else:
-                    logger.warning(f"    ✗ Checksum mismatch in MinIO: expected {expected_checksum}, got {actual_checksum}")
-                    logger.info(f"    Will re-download from NCBI")
-            elif file_exists:
-                logger.info(f"  File exists in MinIO (no checksum available): {filename}")
-                # obj_info already contains size from the HEAD request above
-                file_size = obj_info.get('size') if obj_info else None
-                resource = {
-                    "name": filename,
-                    "path": s3_path + filename,
-                    "format": filename.split('.')[-1] if '.' in filename else "unknown",
-                    "bytes": file_size,
-                    "hash": None
-                }
-                downloaded_resources.append(resource)
-                no_checksum_files.append({
-                    'entry': entry,
-                    'filename': filename,
-                    'status': 'exists_in_minio'
-                })
-                continue
+                    no_checksum_files.append({
+                        'entry': entry,
+                        'filename': filename,
+                        'status': 'exists_in_minio'
+                    })
+                    return resource
             
-            # Try up to 3 times
-            transfer_success = False
-            verified_checksum = False
-            for attempt in range(1, 4):
-                logger.info(f"  Downloading: {filename} (attempt {attempt}/3)")
+                # Try up to 3 times
+                for attempt in range(1, 4):
+                    logger.info(f"  Downloading: {filename} (attempt {attempt}/3)")
                 
-                # Download from FTP
-                with open(local_file, 'wb') as f:
-                    ftp.retrbinary(f'RETR {filename}', f.write)
-                last_ftp_activity = time.monotonic()
+                    # Stream FTP -> MD5 -> MinIO in one pass, with no local copy.
+                    # The MD5 is stored as metadata for fast future verification;
+                    # on a checksum mismatch the upload is aborted, so a corrupt
+                    # object is never written.
+                    metadata = {'md5': expected_checksum} if expected_checksum else None
+                    md5_hash = hashlib.md5()
+                    with s3_client.open_upload_stream(minio_bucket, s3_key, metadata=metadata) as upload:
+                        def _on_chunk(chunk):
+                            md5_hash.update(chunk)
+                            upload.write(chunk)
+                        ftp.retrbinary(f'RETR {full_path}{filename}', _on_chunk, blocksize=FTP_BLOCKSIZE)
+                        _touch_ftp(ftp)
+                        actual_checksum = md5_hash.hexdigest()
+                        if expected_checksum and actual_checksum != expected_checksum:
+                            upload.abort()
+                    file_size = upload.bytes_written
                 
-                # Verify checksum if available
-                if expected_checksum:
-                    actual_checksum = compute_md5(local_file)
-                    if actual_checksum != expected_checksum:
-                        logger.warning(f"    ✗ Checksum mismatch: expected {expected_checksum}, got {actual_checksum}")
-                        if attempt < 3:
-                            logger.info(f"    Retrying...")
-                            continue
+                    # Verify checksum if available
+                    if expected_checksum:
+                        if actual_checksum != expected_checksum:
+                            logger.warning(f"    ✗ Checksum mismatch: expected {expected_checksum}, got {actual_checksum}")
+                            if attempt < 3:
+                                logger.info(f"    Retrying...")
+                                continue
+                            else:
+                                logger.error(f"    Failed after 3 attempts")
+                                failed_transfers.append({
+                                    'entry': entry,
+                                    'filename': filename,
+                                    'reason': f'Checksum mismatch after 3 attempts (expected: {expected_checksum}, got: {actual_checksum})'
+                                })
+                                return None
                         else:
-                            logger.error(f"    Failed after 3 attempts")
-                            failed_transfers.append({
-                                'entry': entry,
-                                'filename': filename,
-                                'reason': f'Checksum mismatch after 3 attempts (expected: {expected_checksum}, got: {actual_checksum})'
-                            })
-                            break
-                    else:
-                        logger.info(f"    ✓ Checksum verified: {actual_checksum}")
-                        verified_checksum = True
+                            logger.info(f"    ✓ Checksum verified: {actual_checksum}")
                     
-                    # Upload to MinIO (store MD5 as metadata for fast future verification)
-                    s3_client.upload_file(
-                        minio_bucket,
-                        s3_path + filename,
-                        str(local_file),
-                        metadata={'md5': actual_checksum}
-                    )
-                    logger.info(f"    Uploaded to MinIO: {s3_path + filename}")
-                    transfer_success = True
+                        logger.info(f"    Uploaded to MinIO: {s3_key}")
                     
-                    # Add to downloaded resources
-                    file_size = local_file.stat().st_size
-                    resource = {
-                        "name": filename,
-                        "path": s3_path + filename,
-                        "format": filename.split('.')[-1] if '.' in filename else "unknown",
-                        "bytes": file_size,
-                        "hash": actual_checksum
-                    }
-                    downloaded_resources.append(resource)
-                    break
-                else:
-                    # No checksum available - upload without verification
-                    logger.warning(f"    WARNING: No checksum available for verification")
-                    s3_client.upload_file(
-                        minio_bucket,
-                        s3_path + filename,
-                        str(local_file)
-                    )
-                    logger.info(f"    Uploaded to MinIO: {s3_path + filename}")
-                    no_checksum_files.append({
-                        'entry': entry,
-                        'filename': filename,
-                        'status': 'newly_uploaded'
-                    })
+                        # Add to downloaded resources
+                        resource = {
+                            "name": filename,
+                            "path": s3_key,
+                            "format": filename.split('.')[-1] if '.' in filename else "unknown",
+                            "bytes": file_size,
+                            "hash": actual_checksum
+                        }
+                        return resource
+                    else:
+                        # No checksum available - upload without verification
+                        logger.warning(f"    WARNING: No checksum available for verification")
+                        logger.info(f"    Uploaded to MinIO: {s3_key}")
+                        no_checksum_files.append({
+                            'entry': entry,
+                            'filename': filename,
+                            'status': 'newly_uploaded'
+                        })
                     
-                    # Add to downloaded resources (without hash)
-                    file_size = local_file.stat().st_size
-                    resource = {
-                        "name": filename,
-                        "path": s3_path + filename,
-                        "format": filename.split('.')[-1] if '.' in filename else "unknown",
-                        "bytes": file_size,
-                        "hash": None
-                    }
-                    downloaded_resources.append(resource)
-                    transfer_success = True
-                    break
+                        # Add to downloaded resources (without hash)
+                        resource = {
+                            "name": filename,
+                            "path": s3_key,
+                            "format": filename.split('.')[-1] if '.' in filename else "unknown",
+                            "bytes": file_size,
+                            "hash": None
+                        }
+                        return resource
+
+            if file_threads > 1 and len(target_files) > 1:
+                # Each worker needs its own control connection: one FTP session
+                # can only run a single transfer at a time.
+                def _transfer_on_own_connection(target):
+                    connection = ftp_pool.acquire() if ftp_pool else _single_ftp_connection(ftp_host)
+                    with connection as file_ftp:
+                        return _transfer_file(file_ftp, target)
+
+                with ThreadPoolExecutor(max_workers=file_threads) as executor:
+                    results = list(executor.map(_transfer_on_own_connection, targets))
+            else:
+                results = [_transfer_file(ftp, target) for target in targets]
+            downloaded_resources = [resource for resource in results if resource is not None]
         
-        logger.info(f"  ✓ Downloaded {len(target_files)} files")
+            logger.info(f"  ✓ Downloaded {len(target_files)} files")
         
-        # Create and upload frictionless data package descriptor
-        if downloaded_resources:
-            logger.info(f"  Creating frictionless data package descriptor")
-            descriptor = create_frictionless_descriptor(
-                assembly_dir,
-                accession_full,
-                downloaded_resources
-            )
-            
-            # Write descriptor to local file
-            descriptor_file = local_dir / 'datapackage.json'
-            with open(descriptor_file, 'w') as f:
-                json.dump(descriptor, f, indent=2)
+            # Create and upload frictionless data package descriptor
+            if downloaded_resources:
+                logger.info(f"  Creating frictionless data package descriptor")
+                descriptor = create_frictionless_descriptor(
+                    assembly_dir,
+                    accession_full,
+                    downloaded_resources
+                )
             
-            # Upload to MinIO
-            s3_client.upload_file(
-                minio_bucket,
-                metadata_path + metadata_filename,
-                str(descriptor_file)
-            )
-            logger.info(f"  ✓ Uploaded {metadata_filename} to MinIO: {metadata_path}{metadata_filename}")
-    
-    except Exception as e:
-        logger.error(f"  ✗ ERROR: {e}")
-        raise
+                # Upload to MinIO straight from memory (a few KB; no temp file)
+                s3_client.put_bytes(
+                    minio_bucket,
+                    metadata_path + metadata_filename,
+                    json.dumps(descriptor, indent=2).encode(),
+                    content_type='application/json'
+                )
+                logger.info(f"  ✓ Uploaded {metadata_filename} to MinIO: {metadata_path}{metadata_filename}")
     
-    finally:
-        try:
-            ftp.quit()
-        except Exception:
-            # The control connection may have timed out after all work was
-            # completed (421 during QUIT).  All files and metadata have
-            # already been uploaded at this point, so silently ignore.
-            pass
+        except Exception as e:
+            logger.error(f"  ✗ ERROR: {e}")
+            raise
 
 
 def run(
@@ -705,6 +1033,10 @@ def run(
     ftp_host='ftp.ncbi.nlm.nih.gov',
     threads=1,
     limit=None,
+    file_threads=1,
+    ncbi_qps=None,
+    use_assembly_summary=False,
+    transport='ftp',
 ):
     """
     Execute the genome download workflow.
@@ -738,11 +1070,31 @@ def run(
         threads:     Number of parallel download threads (default: ``1``).
         limit:       Stop after this many assemblies have been attempted
                      (handy for smoke-testing).
+        file_threads: Number of files transferred in parallel within each
+                     assembly, each over its own FTP connection (default: ``1``).
+        ncbi_qps:    If set, start at most this many assembly downloads per
+                     second across all threads (default: unlimited).
+        use_assembly_summary: When using ``prefix``, discover assemblies from
+                     NCBI's assembly summary file instead of walking the FTP
+                     tree (current assemblies only).
+        transport:   ``'ftp'`` (default) or ``'https'`` to read the same NCBI
+                     tree over HTTPS with kept-alive connections.
     """
 
-    # Initialize MinIO client and temp dir (needed for all modes)
-    s3 = get_minio_client()
-    temp_dir = tempfile.TemporaryDirectory()
+    # Initialize MinIO client (needed for all modes).  Files are streamed
+    # straight from NCBI to MinIO, so nothing is staged locally.  boto3
+    # clients are thread-safe, so every worker shares this one client and its
+    # connection pool.  Each genome file is streamed to MinIO with
+    # stream_transfer_config, which uploads up to max_concurrency multipart
+    # parts at once, so the pool is sized to keep workers from waiting.
+    s3 = get_minio_client(max_pool_connections=max(
+        64, threads * file_threads * stream_transfer_config.max_concurrency))
+    # FTP connections are reused across assemblies and listings.  With
+    # file_threads > 1 each assembly holds its own connection plus one per
+    # file worker, and the pool must cover all of them to avoid deadlock.
+    connections_per_thread = file_threads + 1 if file_threads > 1 else 1
+    ftp_pool = FTPPool(ftp_host, size=threads * connections_per_thread, transport=transport)
+    rate_limiter = RateLimiter(ncbi_qps) if ncbi_qps else None
 
     # Shared counters / state — protected by a lock when accessed from threads
     lock = threading.Lock()
@@ -752,34 +1104,31 @@ def run(
     no_checksum_files = []  # Track files without checksums
 
     def _download_one(entry, is_assembly_path=False):
-        """Download a single assembly in its own temp subdir and MinIO client. Returns (entry, error|None)."""
-        assembly_tmp = tempfile.mkdtemp(dir=temp_dir.name)
-        # MinioClient() gives each thread its own boto3 session/connection pool.
-        # Bucket/prefix validation was already done by get_minio_client() at startup.
-        thread_s3 = MinioClient()
+        """Download a single assembly. Returns (entry, error|None)."""
         last_error = None
-        try:
-            for attempt in range(1, 4):
-                try:
-                    download_genome_files(
-                        entry, thread_s3, assembly_tmp, failed_transfers, no_checksum_files,
-                        ftp_host=ftp_host,
-                        assembly_path=entry if is_assembly_path else None,
+        for attempt in range(1, 4):
+            if rate_limiter:
+                rate_limiter.acquire()
+            try:
+                download_genome_files(
+                    entry, s3, failed_transfers, no_checksum_files,
+                    ftp_host=ftp_host,
+                    assembly_path=entry if is_assembly_path else None,
+                    ftp_pool=ftp_pool,
+                    file_threads=file_threads,
+                )
+                return entry, None
+            except error_temp as e:
+                # 4xx transient errors (425 PASV port collision, 421 timeout, etc.)
+                last_error = e
+                if attempt < 3:
+                    logger.warning(
+                        f"  Transient FTP error on attempt {attempt}/3, retrying in 5s: {e}"
                     )
-                    return entry, None
-                except error_temp as e:
-                    # 4xx transient errors (425 PASV port collision, 421 timeout, etc.)
-                    last_error = e
-                    if attempt < 3:
-                        logger.warning(
-                            f"  Transient FTP error on attempt {attempt}/3, retrying in 5s: {e}"
-                        )
-                        time.sleep(5)
-                except Exception as e:
-                    return entry, e
-            return entry, last_error
-        finally:
-            shutil.rmtree(assembly_tmp, ignore_errors=True)
+                    time.sleep(5)
+            except Exception as e:
+                return entry, e
+        return entry, last_error
 
     def _process_batch(entries, is_assembly_path=False):
         """Submit a batch of entries to the thread pool.
@@ -836,21 +1185,17 @@ def run(
             """Append accessions extracted from assembly paths to the output list file."""
             if output_list_fh:
                 for path in paths:
-                    m = re.search(r'/(GC[AF]_\d{9}\.\d+)_[^/]+/', path)
+                    m = _ACCESSION_FROM_PATH_RE.search(path)
                     if m:
                         output_list_fh.write(m.group(1) + '\n')
                 output_list_fh.flush()
 
         try:
-            if start_from:
+            if start_from and not use_assembly_summary:
                 # Iterative mode: list top-level subdirs, then discover + process
                 # one subdir at a time to avoid building a huge list upfront.
-                ftp = FTP(ftp_host)
-                ftp.login()
-                try:
+                with ftp_pool.acquire() as ftp:
                     top_subdirs = list_ftp_subdirectories(ftp, ftp_path, start_from=start_from)
-                finally:
-                    ftp.quit()
 
                 logger.info(f"Found {len(top_subdirs)} top-level subdirectories >= '{start_from}'")
 
@@ -859,14 +1204,9 @@ def run(
                     remaining = (limit - success_count - len(failed)) if limit else None
 
                     logger.info(f"Scanning subdir: {subdir_path}")
-                    ftp = FTP(ftp_host)
-                    ftp.login()
-                    try:
-                        subdir_paths = find_assembly_directories_in_prefix(
-                            ftp, subdir_path, limit=remaining
-                        )
-                    finally:
-                        ftp.quit()
+                    subdir_paths = find_assembly_directories_in_prefix(
+                        None, subdir_path, limit=remaining, ftp_pool=ftp_pool, concurrency=threads
+                    )
 
                     if not subdir_paths:
                         logger.debug(f"No assemblies found under {subdir_path}")
@@ -898,14 +1238,15 @@ def run(
 
             else:
                 # Non-iterative mode: build the full list first, then process.
-                ftp = FTP(ftp_host)
-                ftp.login()
-                try:
+                if use_assembly_summary:
+                    with ftp_pool.acquire() as ftp:
+                        assembly_paths = find_assembly_directories_from_summary(
+                            ftp, ftp_path, start_from=start_from, limit=limit
+                        )
+                else:
                     assembly_paths = find_assembly_directories_in_prefix(
-                        ftp, ftp_path, limit=limit
+                        None, ftp_path, limit=limit, ftp_pool=ftp_pool, concurrency=threads
                     )
-                finally:
-                    ftp.quit()
 
                 logger.info(f"Found {len(assembly_paths)} assembly directories")
 
@@ -923,6 +1264,8 @@ def run(
             if output_list_fh:
                 output_list_fh.close()
 
+    ftp_pool.close()
+
     # ── Summary ────────────────────────────────────────────────────────────
     total = success_count + len(failed)
     logger.info("\n" + "="*60)
@@ -968,6 +1311,9 @@ Examples:
   # Resume from a specific subdirectory
   python download_genomes.py --prefix GCF --start-from 003
   python download_genomes.py --prefix GCA --start-from 001
+
+  # Discover assemblies from the assembly summary instead of walking the tree
+  python download_genomes.py --prefix GCF/000 --use-assembly-summary
         """
     )
 
@@ -980,6 +1326,17 @@ Examples:
     parser.add_argument('--ftp-host', default='ftp.ncbi.nlm.nih.gov', help='FTP host (default: ftp.ncbi.nlm.nih.gov)')
     parser.add_argument('--threads', type=int, default=1, metavar='N',
                         help='Number of parallel download threads (default: 1)')
+    parser.add_argument('--file-threads', type=int, default=1, metavar='N',
+                        help='Number of files downloaded in parallel within each assembly, '
+                             'each over its own FTP connection (default: 1)')
+    parser.add_argument('--ncbi-qps', type=float, metavar='RATE',
+                        help='Start at most RATE assembly downloads per second across all threads '
+                             '(default: unlimited)')
+    parser.add_argument('--use-assembly-summary', action='store_true',
+                        help='With --prefix, find assemblies in NCBI\'s assembly_summary_*.txt '
+                             'instead of walking the FTP tree (current assemblies only)')
+    parser.add_argument('--transport', choices=['ftp', 'https'], default='ftp',
+                        help='Protocol used to read from the NCBI host (default: ftp)')
     parser.add_argument('--limit', type=int, metavar='N', help='Limit processing to first N accessions (for testing)')
 
     args = parser.parse_args()
@@ -996,6 +1353,9 @@ Examples:
 
     if args.start_from and not args.prefix:
         parser.error('--start-from can only be used with --prefix')
+
+    if args.use_assembly_summary and not args.prefix:
+        parser.error('--use-assembly-summary can only be used with --prefix')
     
     # Set up logging
     log_file = setup_logging(module_name=__name__)
@@ -1009,6 +1369,10 @@ Examples:
         ftp_host=args.ftp_host,
         threads=args.threads,
         limit=args.limit,
+        file_threads=args.file_threads,
+        ncbi_qps=args.ncbi_qps,
+        use_assembly_summary=args.use_assembly_summary,
+        transport=args.transport,
     )
 
 
@@ -0,0 +1,16 @@
+# Helpers shared by the test modules
+import functools
+
+from kbase_transfers import MinioClient
+
+
+@functools.lru_cache(maxsize=1)
+def shared_client():
+    """One MinioClient per test process.
+
+    Building a boto3 client loads the S3 service model, so the test classes
+    share one client (and its connection pool) instead of each making
+    their own.  Tests that stub the client with Stubber still create a
+    private one.
+    """
+    return MinioClient()
@@ -1,62 +1,49 @@
-# Test for the MinIO client using a local MinIO server
+# Tests for the MinIO client.  TestMinioClientUnit runs against moto's
+# in-memory S3 or botocore stubs; TestMinioClient needs a live MinIO server
+# and only runs when KBASE_MINIO_LIVE is set.
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from botocore.awsrequest import AWSResponse
+from botocore.exceptions import ClientError
+from boto3.s3.transfer import TransferConfig
+from botocore.stub import Stubber
+from moto import mock_aws
 from kbase_transfers import MinioClient
+from kbase_transfers import minio_client
+from _shared import shared_client
 import os
 import tempfile
-import json
+import orjson
+import gzip
+import hashlib
+import zstandard
+
+# Adaptive retry mode also throttles the client itself after errors; the
+# retry tests patch out that wait along with the backoff sleeps
+_RATE_LIMIT_WAIT = 'botocore.retries.bucket.TokenBucket.acquire'
+
+
+class _RawBody:
+    """Minimal stand-in for a urllib3 response body, for injected AWSResponses."""
+
+    def __init__(self, body):
+        self._body = body
+
+    def stream(self, **kwargs):
+        yield self._body
+
+
+@mock_aws
+class TestMinioClientUnit(unittest.TestCase):
+    """Client semantics, checked against moto's in-memory S3 or stubs (no network)."""
+
+    def setUp(self):
+        # No endpoint_url: moto intercepts requests to the default S3 endpoint
+        self.client = MinioClient(endpoint_url=None, access_key="testing", secret_key="testing")
+        self.test_bucket = "test-bucket"
+        self.client.s3.create_bucket(Bucket=self.test_bucket)
 
-class TestMinioClient(unittest.TestCase):
-    @classmethod
-    def setUpClass(cls):
-        # Initialize MinIO client
-        cls.client = MinioClient()
-        cls.test_bucket = "test-bucket"
-        
-        # Create test bucket if it doesn't exist
-        existing_buckets = cls.client.list_buckets()
-        if cls.test_bucket not in existing_buckets:
-            cls.client.s3.create_bucket(Bucket=cls.test_bucket)
-    
-    def test_upload_and_download_file(self):
-        # Create a temporary file to upload
-        with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
-            tmp_file.write(b"Hello, MinIO!")
-            tmp_file_path = tmp_file.name
-        
-        object_name = "test_upload.txt"
-        
-        # Upload the file
-        self.client.upload_file(self.test_bucket, object_name, tmp_file_path)
-        
-        # Download the file to a new temporary location
-        download_path = tmp_file_path + "_downloaded"
-        self.client.download_file(self.test_bucket, object_name, download_path)
-        
-        # Verify the contents
-        with open(download_path, 'rb') as f:
-            content = f.read()
-            self.assertEqual(content, b"Hello, MinIO!")
-        
-        # Clean up temporary files
-        os.remove(tmp_file_path)
-        os.remove(download_path)
-    
-    def test_list_objects(self):
-        # Ensure the test object exists
-        object_name = "test_list.txt"
-        with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
-            tmp_file.write(b"List Test")
-            tmp_file_path = tmp_file.name
-        
-        self.client.upload_file(self.test_bucket, object_name, tmp_file_path)
-        
-        # List objects in the bucket
-        objects = self.client.list_objects(self.test_bucket)
-        self.assertIn(object_name, objects)
-        
-        # Clean up
-        os.remove(tmp_file_path)
-    
     def test_put_json_object(self):
         # Create test JSON data
         test_data = {
@@ -75,28 +62,24 @@ class TestMinioClient(unittest.TestCase):
         
         # Retrieve and verify the object
         response = self.client.s3.get_object(Bucket=self.test_bucket, Key=object_name)
-        retrieved_data = json.loads(response['Body'].read())
+        retrieved_data = orjson.loads(response['Body'].read())
         
         self.assertEqual(retrieved_data, test_data)
         
         # Verify ContentType
         self.assertEqual(response['ContentType'], 'application/json')
-    
+
     def test_bucket_exists(self):
         # Test with existing bucket
         self.assertTrue(self.client.bucket_exists(self.test_bucket))
         
         # Test with non-existing bucket
         self.assertFalse(self.client.bucket_exists("non-existent-bucket-12345"))
-    
+
     def test_prefix_exists(self):
         # Create a test object with a prefix structure
         object_name = "test/prefix/structure/file.txt"
-        with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
-            tmp_file.write(b"Prefix Test")
-            tmp_file_path = tmp_file.name
-        
-        self.client.upload_file(self.test_bucket, object_name, tmp_file_path)
+        self.client.put_bytes(self.test_bucket, object_name, b"Prefix Test")
         
         # Test existing prefix
         self.assertTrue(self.client.prefix_exists(self.test_bucket, "test/"))
@@ -105,16 +88,300 @@ class TestMinioClient(unittest.TestCase):
         
         # Test non-existing prefix
         self.assertFalse(self.client.prefix_exists(self.test_bucket, "nonexistent/"))
+
+    def test_file_transfers_use_transfer_config(self):
+        client = MinioClient()
+        with patch.object(client.s3, 'upload_file') as upload, \
+                patch.object(client.s3, 'download_file') as download:
+            client.upload_file(self.test_bucket, "config.txt", "/tmp/config.txt")
+            client.download_file(self.test_bucket, "config.txt", "/tmp/config.txt")
+        self.assertIs(upload.call_args.kwargs['Config'], minio_client.file_transfer_config)
+        self.assertIs(download.call_args.kwargs['Config'], minio_client.file_transfer_config)
+        self.assertEqual(minio_client.file_transfer_config.io_chunksize, 1024 * 1024)
+
+    def test_max_pool_connections(self):
+        self.assertEqual(self.client.s3.meta.config.max_pool_connections, 64)
+        client = MinioClient(max_pool_connections=128)
+        self.assertEqual(client.s3.meta.config.max_pool_connections, 128)
+        self.assertEqual(client.s3.meta.config.retries['mode'], 'adaptive')
+
+    def test_checksums_only_when_required(self):
+        config = self.client.s3.meta.config
+        self.assertEqual(config.request_checksum_calculation, 'when_required')
+        self.assertEqual(config.response_checksum_validation, 'when_required')
+
+        sent_headers = []
+        self.client.s3.meta.events.register(
+            'before-send.s3.PutObject', lambda request, **kwargs: sent_headers.append(request.headers))
+        self.client.put_bytes(self.test_bucket, "no_checksum.bin", b"payload")
+
+        self.assertEqual(len(sent_headers), 1)
+        self.assertFalse([h for h in sent_headers[0] if h.lower().startswith('x-amz-checksum')])
+
+    def test_list_objects_paginates(self):
+        client = MinioClient()
+        with Stubber(client.s3) as stubber:
+            stubber.add_response('list_objects_v2',
+                                 {'Contents': [{'Key': 'p/a'}], 'IsTruncated': True, 'NextContinuationToken': 't'},
+                                 {'Bucket': self.test_bucket, 'Prefix': 'p/', 'MaxKeys': 1000})
+            stubber.add_response('list_objects_v2',
+                                 {'Contents': [{'Key': 'p/b'}], 'IsTruncated': False},
+                                 {'Bucket': self.test_bucket, 'Prefix': 'p/', 'MaxKeys': 1000,
+                                  'ContinuationToken': 't'})
+            self.assertEqual(client.list_objects(self.test_bucket, "p/"), ['p/a', 'p/b'])
+            stubber.assert_no_pending_responses()
+
+    def _respond_to_puts(self, *statuses):
+        """Answer PutObject requests with these HTTP statuses, in order.
+
+        The responses are injected at before-send, below botocore's retry
+        handler, so retries behave as they would against a real server.
+        Returns the list of requests sent.
+        """
+        sent = []
+        errors = {503: b'<Error><Code>SlowDown</Code><Message>Reduce your request rate.</Message></Error>',
+                  403: b'<Error><Code>AccessDenied</Code><Message>Access Denied</Message></Error>'}
+
+        def respond(request, **kwargs):
+            status = statuses[min(len(sent), len(statuses) - 1)]
+            sent.append(request)
+            return AWSResponse(request.url, status, {'ETag': '"0"'}, _RawBody(errors.get(status, b'')))
+
+        self.client.s3.meta.events.register('before-send.s3.PutObject', respond)
+        return sent
+
+    def test_put_json_object_retries_throttling(self):
+        sent = self._respond_to_puts(503, 503, 200)
+        with patch('botocore.endpoint.time.sleep') as sleep, patch(_RATE_LIMIT_WAIT, return_value=True):
+            self.assertTrue(self.client.put_json_object(self.test_bucket, "retry.json", {"a": 1}))
+        self.assertEqual(len(sent), 3)
+        self.assertEqual(sleep.call_count, 2)
+
+    def test_put_json_object_retries_in_one_layer(self):
+        # botocore's attempts are the only ones: a throttled PUT is sent
+        # 1 + max_attempts times, never multiplied by an outer retry loop
+        sent = self._respond_to_puts(503)
+        with patch('botocore.endpoint.time.sleep'), patch(_RATE_LIMIT_WAIT, return_value=True), \
+                self.assertRaises(ClientError):
+            self.client.put_json_object(self.test_bucket, "throttled.json", {"a": 1})
+        self.assertEqual(len(sent), self.client.s3.meta.config.retries['total_max_attempts'])
+        self.assertEqual(len(sent), 11)
+
+    def test_put_json_object_does_not_retry_client_errors(self):
+        sent = self._respond_to_puts(403)
+        with patch('botocore.endpoint.time.sleep') as sleep, self.assertRaises(ClientError):
+            self.client.put_json_object(self.test_bucket, "denied.json", {"a": 1})
+        self.assertEqual(len(sent), 1)
+        sleep.assert_not_called()
+
+    def test_prefix_exists_fetches_one_key(self):
+        # The check must stay a MaxKeys=1 LIST, never a full listing page
+        client = MinioClient()
+        with Stubber(client.s3) as stubber:
+            stubber.add_response('list_objects_v2', {'KeyCount': 1, 'Contents': [{'Key': 'test/a'}]},
+                                 {'Bucket': self.test_bucket, 'Prefix': 'test/', 'MaxKeys': 1})
+            stubber.add_response('list_objects_v2', {'KeyCount': 0},
+                                 {'Bucket': self.test_bucket, 'Prefix': 'nonexistent/', 'MaxKeys': 1})
+            self.assertTrue(client.prefix_exists(self.test_bucket, "test/"))
+            self.assertFalse(client.prefix_exists(self.test_bucket, "nonexistent/"))
+            stubber.assert_no_pending_responses()
+
+
+@unittest.skipUnless(os.environ.get('KBASE_MINIO_LIVE'), 'needs a live MinIO server (set KBASE_MINIO_LIVE=1)')
+class TestMinioClient(unittest.TestCase):
+    # Objects the read-only tests expect to find, uploaded once for the class
+    _FIXTURES = {
+        "test_list.txt": b"List Test",
+        **{f"test/keys_set/{i:04d}.json": b"{}" for i in range(5)},
+        "test/stat_prefix/a.txt": b"aaa",
+        "test/stat_prefix/b.txt": b"bbbbb",
+        "test_stat.bin": b"stat me",
+        "test/object_md5.bin": b"x" * (3 * 1024 * 1024 + 5),
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        # Initialize MinIO client
+        cls.client = shared_client()
+        cls.test_bucket = "test-bucket"
         
-        # Clean up
-        os.remove(tmp_file_path)
+        # Create test bucket if it doesn't exist
+        existing_buckets = cls.client.list_buckets()
+        if cls.test_bucket not in existing_buckets:
+            cls.client.s3.create_bucket(Bucket=cls.test_bucket)
+
+        # Upload every fixture concurrently rather than one per test
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            list(executor.map(lambda item: cls.client.put_bytes(cls.test_bucket, *item),
+                              cls._FIXTURES.items()))
     
+    def test_upload_and_download_file(self):
+        # Create a temporary file to upload
+        with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
+            tmp_file.write(b"Hello, MinIO!")
+            tmp_file_path = tmp_file.name
+        
+        object_name = "test_upload.txt"
+        
+        # Upload the file
+        self.client.upload_file(self.test_bucket, object_name, tmp_file_path)
+        
+        # Download the file to a new temporary location
+        download_path = tmp_file_path + "_downloaded"
+        self.client.download_file(self.test_bucket, object_name, download_path)
+        
+        # Verify the contents
+        with open(download_path, 'rb') as f:
+            content = f.read()
+            self.assertEqual(content, b"Hello, MinIO!")
+        
+        # Clean up temporary files
+        os.remove(tmp_file_path)
+        os.remove(download_path)
+
+    def test_list_objects(self):
+        object_name = "test_list.txt"
+        
+        # List objects in the bucket
+        objects = self.client.list_objects(self.test_bucket)
+        self.assertIn(object_name, objects)
+
+    def test_list_keys_set(self):
+        keys = {f"test/keys_set/{i:04d}.json" for i in range(5)}
+
+        self.assertEqual(self.client.list_keys_set(self.test_bucket, "test/keys_set/"), keys)
+        self.assertEqual(self.client.list_keys_set(self.test_bucket, "nonexistent/"), set())
+
+    def test_put_bytes(self):
+        object_name = "test_bytes.ndjson"
+
+        self.assertTrue(self.client.put_bytes(
+            self.test_bucket, object_name, b'{"a": 1}\n', content_type='application/x-ndjson'))
+
+        response = self.client.s3.get_object(Bucket=self.test_bucket, Key=object_name)
+        self.assertEqual(response['Body'].read(), b'{"a": 1}\n')
+        self.assertEqual(response['ContentType'], 'application/x-ndjson')
+
+    def test_put_bytes_multipart(self):
+        object_name = "test_bytes_multipart.bin"
+        body = os.urandom(6 * 1024 * 1024)
+        # S3's minimum part size is 5 MiB
+        small_parts = TransferConfig(multipart_threshold=5 * 1024 * 1024,
+                                     multipart_chunksize=5 * 1024 * 1024)
+
+        with patch.object(minio_client, 'payload_transfer_config', small_parts):
+            self.client.put_bytes(self.test_bucket, object_name, body)
+
+        response = self.client.s3.get_object(Bucket=self.test_bucket, Key=object_name)
+        self.assertEqual(response['Body'].read(), body)
+        # Multipart ETags carry a '-<part count>' suffix
+        self.assertTrue(response['ETag'].strip('"').endswith('-2'))
+
+    def test_stat_object(self):
+        object_name = "test_stat.bin"
+        body = self._FIXTURES[object_name]
+
+        info = self.client.stat_object(self.test_bucket, object_name)
+        self.assertEqual(info['size'], len(body))
+        self.assertIsNone(info['md5'])
+        # Single-part ETag is the content MD5, without quotes
+        self.assertEqual(info['etag'], hashlib.md5(body).hexdigest())
+        self.assertIsNone(self.client.stat_object(self.test_bucket, "missing.bin"))
+
+    def test_object_md5(self):
+        body = self._FIXTURES["test/object_md5.bin"]
+
+        md5 = self.client.object_md5(self.test_bucket, "test/object_md5.bin", chunk_size=1024 * 1024)
+        self.assertEqual(md5, hashlib.md5(body).hexdigest())
+
+    def test_delete_objects(self):
+        keys = [f"test/delete_objects/{i}.txt" for i in range(3)]
+        for key in keys:
+            self.client.put_bytes(self.test_bucket, key, b"x")
+
+        self.assertEqual(self.client.delete_objects(self.test_bucket, keys), 3)
+        self.assertEqual(self.client.list_objects(self.test_bucket, "test/delete_objects/"), [])
+        self.assertEqual(self.client.delete_objects(self.test_bucket, []), 0)
+
+    def test_stat_prefix(self):
+        stats = self.client.stat_prefix(self.test_bucket, "test/stat_prefix/")
+        self.assertEqual(stats, {
+            'a.txt': {'size': 3, 'etag': hashlib.md5(b"aaa").hexdigest()},
+            'b.txt': {'size': 5, 'etag': hashlib.md5(b"bbbbb").hexdigest()},
+        })
+        self.assertEqual(self.client.stat_prefix(self.test_bucket, "nonexistent/"), {})
+
+    def test_open_upload_stream(self):
+        data = os.urandom(9 * 1024 * 1024)
+        object_name = "test_stream.bin"
+
+        with self.client.open_upload_stream(self.test_bucket, object_name, metadata={'md5': 'abc'}) as upload:
+            for i in range(0, len(data), 1 << 16):
+                upload.write(data[i:i + (1 << 16)])
+        self.assertEqual(upload.bytes_written, len(data))
+
+        response = self.client.s3.get_object(Bucket=self.test_bucket, Key=object_name)
+        self.assertEqual(response['Body'].read(), data)
+        self.assertEqual(response['Metadata'], {'md5': 'abc'})
+
+    def test_open_upload_stream_abort(self):
+        object_name = "test_stream_aborted.bin"
+
+        with self.client.open_upload_stream(self.test_bucket, object_name) as upload:
+            upload.write(os.urandom(9 * 1024 * 1024))
+            upload.abort()
+        with self.assertRaises(RuntimeError):
+            with self.client.open_upload_stream(self.test_bucket, object_name) as upload:
+                upload.write(b"partial")
+                raise RuntimeError("source failed")
+
+        self.assertIsNone(self.client.stat_object(self.test_bucket, object_name))
+        uploads = self.client.s3.list_multipart_uploads(Bucket=self.test_bucket)
+        self.assertFalse(uploads.get('Uploads'))
+
+    def test_put_json_object_if_absent(self):
+        object_name = "test_json_if_absent.json"
+
+        self.assertTrue(self.client.put_json_object(
+            self.test_bucket, object_name, {"version": 1}, if_absent=True))
+        self.assertFalse(self.client.put_json_object(
+            self.test_bucket, object_name, {"version": 2}, if_absent=True))
+
+        # The original object must not have been overwritten
+        response = self.client.s3.get_object(Bucket=self.test_bucket, Key=object_name)
+        self.assertEqual(orjson.loads(response['Body'].read()), {"version": 1})
+
+    def test_put_json_object_gzip(self):
+        object_name = "test_json_object.json.gz"
+        data = {"key": "value", "numbers": [1, 2, 3]}
+
+        self.client.put_json_object(self.test_bucket, object_name, data, compression='gzip')
+
+        response = self.client.s3.get_object(Bucket=self.test_bucket, Key=object_name)
+        self.assertEqual(response['ContentEncoding'], 'gzip')
+        self.assertEqual(response['ContentType'], 'application/json')
+        self.assertEqual(orjson.loads(gzip.decompress(response['Body'].read())), data)
+
+        with self.assertRaises(ValueError):
+            self.client.put_json_object(self.test_bucket, object_name, data, compression='lz4')
+
+    def test_put_json_object_zstd(self):
+        object_name = "test_json_object.json.zst"
+        data = {"key": "value", "numbers": [1, 2, 3], "empty": None}
+
+        self.client.put_json_object(self.test_bucket, object_name, data, compression='zstd')
+
+        response = self.client.s3.get_object(Bucket=self.test_bucket, Key=object_name)
+        self.assertEqual(response['ContentEncoding'], 'zstd')
+        self.assertEqual(response['ContentType'], 'application/json')
+        body = zstandard.ZstdDecompressor().decompress(response['Body'].read())
+        self.assertEqual(orjson.loads(body), data)
+
     @classmethod
     def tearDownClass(cls):
         # Optionally delete the test bucket and its contents
         objects = cls.client.list_objects(cls.test_bucket)
-        for obj in objects:
-            cls.client.s3.delete_object(Bucket=cls.test_bucket, Key=obj)
+        cls.client.delete_objects(cls.test_bucket, objects)
         cls.client.s3.delete_bucket(Bucket=cls.test_bucket)
 
 
@@ -6,23 +6,35 @@ of records to MinIO, then verifies their successful creation.
 """
 
 import unittest
-import sys
-import json
+import orjson
+import pandas as pd
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from unittest.mock import patch
 
-# Add parent directory to path
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
-from kbase_transfers import MinioClient
+from _shared import shared_client
 from scripts.nayfach_2020.download_and_load import (
+    _compile_file_filters,
+    _filter_resources,
+    collect_sheet_stats,
     download_xlsx,
     load_sheet,
     BUCKET_NAME,
     BASE_PATH,
     METAGENOMES_PATH,
-    MAGS_PATH
+    MAGS_PATH,
+    XLSX_FILENAME
 )
 
+_REPO_ROOT = Path(__file__).resolve().parent.parent
+_DATA_DIR = _REPO_ROOT / "scripts" / "nayfach_2020" / "data"
+
+
+def _dir_prefix(prefix):
+    """Return prefix with a trailing slash, so listings stop at a directory boundary."""
+    return prefix if prefix.endswith('/') else prefix + '/'
+
 
 class TestNayfachIntegration(unittest.TestCase):
     """Integration test for nayfach_2020 script."""
@@ -30,13 +42,15 @@ class TestNayfachIntegration(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
         """Set up test environment."""
-        cls.client = MinioClient()
+        cls.client = shared_client()
         cls.test_limit = 3  # Number of records to test with
+        # load_sheet uploads records from a thread pool; one worker per
+        # test record (capped) puts them all in flight at once
+        cls.test_concurrency = min(cls.test_limit, 16)
         
         # Download Excel file if needed
-        data_dir = Path(__file__).parent.parent / "scripts" / "nayfach_2020" / "data"
-        data_dir.mkdir(parents=True, exist_ok=True)
-        cls.xlsx_path = download_xlsx(data_dir, force=False)
+        _DATA_DIR.mkdir(parents=True, exist_ok=True)
+        cls.xlsx_path = download_xlsx(_DATA_DIR, force=False)
         
         print(f"\nUsing Excel file: {cls.xlsx_path}")
         
@@ -51,8 +65,9 @@ class TestNayfachIntegration(unittest.TestCase):
             cls.client.s3.create_bucket(Bucket=BUCKET_NAME)
             print(f"Created bucket: {BUCKET_NAME}")
         
-        # Create base path if it doesn't exist
-        if not cls.client.prefix_exists(BUCKET_NAME, BASE_PATH + "/"):
+        # Create base path if it doesn't exist (a HEAD on the known
+        # placeholder key rather than a LIST of the prefix)
+        if cls.client.stat_object(BUCKET_NAME, f"{BASE_PATH}/.placeholder") is None:
             cls.client.s3.put_object(
                 Bucket=BUCKET_NAME,
                 Key=f"{BASE_PATH}/.placeholder",
@@ -65,10 +80,11 @@ class TestNayfachIntegration(unittest.TestCase):
         # Load a small number of metagenomes
         load_sheet(self.client, self.xlsx_path, sheet_name='S1', label='metagenomes',
                    dest_path=METAGENOMES_PATH, folder_col='IMG_TAXON_ID',
-                   dts_id_col='IMG_TAXON_ID', dry_run=False, limit=self.test_limit)
+                   dts_id_col='IMG_TAXON_ID', dry_run=False, limit=self.test_limit,
+                   concurrency=self.test_concurrency)
 
         # Verify the metagenomes were created
-        objects = self.client.list_objects(BUCKET_NAME, METAGENOMES_PATH + "/")
+        objects = self.client.list_objects(BUCKET_NAME, _dir_prefix(METAGENOMES_PATH))
         metagenome_ids = set()
 
         for obj in objects:
@@ -84,7 +100,7 @@ class TestNayfachIntegration(unittest.TestCase):
         # Verify one metagenome JSON structure
         first_object = [obj for obj in objects if obj.endswith('/gems_info.json')][0]
         response = self.client.s3.get_object(Bucket=BUCKET_NAME, Key=first_object)
-        data = json.loads(response['Body'].read())
+        data = orjson.loads(response['Body'].read())
         
         # Verify expected fields
         self.assertIn('IMG_TAXON_ID', data)
@@ -102,10 +118,11 @@ class TestNayfachIntegration(unittest.TestCase):
         # Load a small number of MAGs
         load_sheet(self.client, self.xlsx_path, sheet_name='S2', label='MAGs',
                    dest_path=MAGS_PATH, folder_col='genome_id',
-                   dts_id_col='img_taxon_id', dry_run=False, limit=self.test_limit)
+                   dts_id_col='img_taxon_id', dry_run=False, limit=self.test_limit,
+                   concurrency=self.test_concurrency)
 
         # Verify the MAGs were created
-        objects = self.client.list_objects(BUCKET_NAME, MAGS_PATH + "/")
+        objects = self.client.list_objects(BUCKET_NAME, _dir_prefix(MAGS_PATH))
         mag_ids = set()
 
         for obj in objects:
@@ -121,7 +138,7 @@ class TestNayfachIntegration(unittest.TestCase):
         # Verify one MAG JSON structure
         first_object = [obj for obj in objects if obj.endswith('/gems_info.json')][0]
         response = self.client.s3.get_object(Bucket=BUCKET_NAME, Key=first_object)
-        data = json.loads(response['Body'].read())
+        data = orjson.loads(response['Body'].read())
         
         # Verify expected fields
         self.assertIn('genome_id', data)
@@ -137,19 +154,19 @@ class TestNayfachIntegration(unittest.TestCase):
     
     def test_json_content_integrity(self):
         """Test that JSON data is properly formatted and contains expected values."""
-        # Load one record
-        load_sheet(self.client, self.xlsx_path, sheet_name='S1', label='metagenomes',
-                   dest_path=METAGENOMES_PATH, folder_col='IMG_TAXON_ID',
-                   dts_id_col='IMG_TAXON_ID', dry_run=False, limit=1)
+        # Load one record; load_sheet returns the keys it wrote, so no
+        # listing is needed to find it
+        uploaded_keys = load_sheet(self.client, self.xlsx_path, sheet_name='S1', label='metagenomes',
+                                   dest_path=METAGENOMES_PATH, folder_col='IMG_TAXON_ID',
+                                   dts_id_col='IMG_TAXON_ID', dry_run=False, limit=1)
 
-        # Get the first metagenome
-        objects = self.client.list_objects(BUCKET_NAME, METAGENOMES_PATH + "/")
-        metagenome_objects = [obj for obj in objects if obj.endswith('/gems_info.json')]
-        self.assertGreater(len(metagenome_objects), 0, "No metagenome objects found")
+        metagenome_objects = [key for key in uploaded_keys if key.endswith('/gems_info.json')]
+        self.assertEqual(len(metagenome_objects), 1, "No metagenome objects found")
+        first_object = metagenome_objects[0]
         
         # Retrieve and verify JSON
-        response = self.client.s3.get_object(Bucket=BUCKET_NAME, Key=metagenome_objects[0])
-        data = json.loads(response['Body'].read())
+        response = self.client.s3.get_object(Bucket=BUCKET_NAME, Key=first_object)
+        data = orjson.loads(response['Body'].read())
         
         # Verify null handling - some fields should be None
         has_null = any(value is None for value in data.values())
@@ -163,24 +180,129 @@ class TestNayfachIntegration(unittest.TestCase):
                                f"Field {key} contains 'nan' string: {value}")
         
         print(f"\n✓ Verified JSON content integrity")
+
+    def test_lost_conditional_put_is_not_reported(self):
+        """A conditional PUT that finds the object already written is not returned as uploaded."""
+        # put_json_object returns False when another writer created the key first
+        with patch.object(self.client, 'put_json_object', return_value=False) as put:
+            uploaded_keys = load_sheet(self.client, self.xlsx_path, sheet_name='S1', label='metagenomes',
+                                       dest_path=f"{BASE_PATH}/lost_put_test", folder_col='IMG_TAXON_ID',
+                                       dts_id_col='IMG_TAXON_ID', limit=2, skip_existing=True)
+        self.assertEqual(put.call_count, 2)
+        self.assertEqual(uploaded_keys, [])
     
     @classmethod
     def tearDownClass(cls):
         """Clean up test data from MinIO."""
         print("\nCleaning up test data...")
         
-        # Delete all metagenomes
-        metagenome_objects = cls.client.list_objects(BUCKET_NAME, METAGENOMES_PATH + "/")
-        for obj in metagenome_objects:
-            cls.client.s3.delete_object(Bucket=BUCKET_NAME, Key=obj)
+        # Delete all metagenomes and MAGs, listing and deleting both
+        # prefixes concurrently
+        def _clean(prefix):
+            objects = cls.client.list_objects(BUCKET_NAME, _dir_prefix(prefix))
+            cls.client.delete_objects(BUCKET_NAME, objects)
+            return objects
         
-        # Delete all MAGs
-        mag_objects = cls.client.list_objects(BUCKET_NAME, MAGS_PATH + "/")
-        for obj in mag_objects:
-            cls.client.s3.delete_object(Bucket=BUCKET_NAME, Key=obj)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            metagenome_objects, mag_objects = executor.map(_clean, [METAGENOMES_PATH + "/", MAGS_PATH + "/"])
         
         print(f"✓ Cleaned up {len(metagenome_objects)} metagenomes and {len(mag_objects)} MAGs")
 
 
+class TestCollectSheetStats(unittest.TestCase):
+    """collect_sheet_stats with the sheet and DTS searches stubbed out."""
+
+    def test_counts_filtered_files_per_row(self):
+        sheet = pd.DataFrame({
+            'IMG_TAXON_ID': [3300000001, 3300000002, None],
+            'DTS_ID': [3300000001, 3300000002, None],
+        })
+        resources = {
+            '3300000001': [
+                {'path': 'a/3300000001.fna'},
+                {'path': 'a/3300000001.faa'},
+                {'path': 'a/final.contigs.fasta'},
+                {'path': 'a/README.txt'},
+            ],
+            '3300000002': [],
+        }
+
+        with patch('scripts.nayfach_2020.download_and_load.read_sheet', return_value=sheet), \
+                patch('scripts.nayfach_2020.download_and_load.query_dts_resources',
+                      side_effect=lambda dts_id, *args, **kwargs: resources[dts_id]):
+            stats = collect_sheet_stats('unused.xlsx', 'sheet', 'IMG_TAXON_ID', 'DTS_ID',
+                                        dts_client=None, orcid=None)
+
+        self.assertEqual(stats['id'].tolist()[:2], ['3300000001', '3300000002'])
+        self.assertTrue(pd.isna(stats['id'][2]))
+        self.assertEqual(stats['total_files'].tolist(), [4, 0, 0])
+        self.assertEqual(stats['.fna files'].tolist(), [1, 0, 0])
+        self.assertEqual(stats['.faa files'].tolist(), [1, 0, 0])
+        self.assertEqual(stats['.gff files'].tolist(), [0, 0, 0])
+        self.assertEqual(stats['final.contigs.fasta'].tolist(), [1, 0, 0])
+
+
+
+class TestFilterResources(unittest.TestCase):
+    """FILE_FILTERS matching in _filter_resources."""
+
+    def _labels(self, paths):
+        resources = [{'path': path} for path in paths]
+        return [(r['path'], r['filter_label'], r['dest_name']) for r in _filter_resources(resources, '42')]
+
+    def test_suffix_rules_ignore_case(self):
+        self.assertEqual(self._labels(['a/X.FNA', 'a/y.Faa', 'a/z.gff', 'a/w.txt', 'a/FINAL.CONTIGS.FASTA']), [
+            ('a/X.FNA', '.fna files', 'X.FNA'),
+            ('a/y.Faa', '.faa files', 'y.Faa'),
+            ('a/z.gff', '.gff files', 'z.gff'),
+        ])
+
+    def test_first_matching_rule_wins(self):
+        rules = [
+            {"label": "contigs", "filename": "final.contigs.fasta", "rename_to": "{img_taxon_id}.contigs.fasta"},
+            {"label": "fasta", "suffix": ".FASTA"},
+        ]
+        with patch.multiple('scripts.nayfach_2020.download_and_load',
+                            FILE_FILTERS=rules, _FILE_FILTERS_RE=_compile_file_filters(rules)):
+            self.assertEqual(self._labels(['a/final.contigs.fasta', 'a/other.Fasta']), [
+                ('a/final.contigs.fasta', 'contigs', '42.contigs.fasta'),
+                ('a/other.Fasta', 'fasta', 'other.Fasta'),
+            ])
+            # With the suffix rule first, it takes the file instead
+            rules.reverse()
+            with patch('scripts.nayfach_2020.download_and_load._FILE_FILTERS_RE', _compile_file_filters(rules)):
+                self.assertEqual(self._labels(['a/final.contigs.fasta']), [
+                    ('a/final.contigs.fasta', 'fasta', 'final.contigs.fasta'),
+                ])
+
+
+class TestDownloadXlsx(unittest.TestCase):
+    """download_xlsx's reuse of an existing file, with no network access."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.data_dir = Path(tmp.name)
+        self.xlsx_path = self.data_dir / XLSX_FILENAME
+        self.digest_path = self.data_dir / (XLSX_FILENAME + '.sha256')
+        pd.DataFrame({'IMG_TAXON_ID': [1]}).to_excel(self.xlsx_path, index=False)
+
+    def test_legacy_workbook_is_reused(self):
+        with patch('scripts.nayfach_2020.download_and_load.requests.Session') as session:
+            self.assertEqual(download_xlsx(self.data_dir), self.xlsx_path)
+        session.assert_not_called()
+        self.assertTrue(self.digest_path.exists())
+
+    def test_truncated_legacy_file_is_downloaded_again(self):
+        data = self.xlsx_path.read_bytes()
+        self.xlsx_path.write_bytes(data[:len(data) // 2])
+
+        with patch('scripts.nayfach_2020.download_and_load.requests.Session',
+                   side_effect=ConnectionError("download attempted")):
+            with self.assertRaisesRegex(ConnectionError, "download attempted"):
+                download_xlsx(self.data_dir)
+        self.assertFalse(self.digest_path.exists())
+
+
 if __name__ == '__main__':
     unittest.main()